@@ -0,0 +1,156 @@
+#**********************************************************************
+#   anytime.py
+#
+#   Anytime Repairing A* (ARA*) for search.py: a series of weighted A*
+#   searches, ordered by g + w*h, with w lowered by --w_step after each
+#   one, from --w (or 3 if --w is not above 1) down to 1. Each search
+#   reuses the g values and the open list of the last: only states
+#   whose g has improved since they were expanded (the inconsistent
+#   states) are expanded again. A search ends once the best solution
+#   costs no more than the smallest key in the open list, so it is
+#   within a factor w of optimal.
+#
+#   Each better solution (or better bound) is reported as soon as it is
+#   found, with the bound on its suboptimality: its cost divided by the
+#   smallest g + h of the open and inconsistent states (at most w),
+#   printed and flushed so that a consumer reading the output can act
+#   on it straight away. At --time_limit the search stops and returns
+#   the best solution found so far, or gives up if it has none.
+#
+#   python3 search.py --env sliding --start 16D75034BA8E29CF --s arastar --w 3
+#   python3 search.py --env sliding --rows 5 --d 200 --s arastar --time_limit 10
+#
+import heapq
+import time
+
+from node_heap import Node
+from limits import LimitReached, check_limits
+from stats import heap_ops
+
+class ARAStar:
+
+    def __init__(self,start,args):
+        self.args = args
+        self.w = args.w if args.w > 1 else 3.0
+        self.best = {start.state.key():start}    # key -> best node
+        self.opened = {start.state.key()}
+        self.incons = set()
+        self.goal = start if start.state.is_goal() else None
+        self.num_expand = 0
+
+    #******************************************************************
+    #  Search, calling report(goal,w,bound,num_expand,seconds,args) each
+    #  time the solution or its bound improves. Return the best goal node (or None), the
+    #  number of nodes expanded, and the number of solutions and the
+    #  bound on the last.
+    #
+    def search(self,report=None):
+        if report is None:
+            report = print_improvement
+        t0 = time.perf_counter()
+        solutions = 0
+        bound = float('inf')
+        reported = bound
+        try:
+            while True:
+                cost = None if self.goal is None else self.goal.g
+                self.improve_path()
+                if self.goal is None:
+                    break
+                bound = self.suboptimality()
+                if cost is None or self.goal.g < cost:
+                    solutions += 1
+                if solutions > 0 and bound < reported:
+                    reported = bound
+                    report(self.goal,self.w,bound,self.num_expand,
+                           time.perf_counter() - t0,self.args)
+                if bound <= 1 or self.w <= 1 or not (self.opened or
+                                                     self.incons):
+                    break
+                self.w = max(1.0,self.w - self.args.w_step)
+                self.opened |= self.incons
+                self.incons = set()
+        except LimitReached as limit:
+            if self.goal is None:
+                raise
+            print('Stopped:',limit,file=self.args.out)
+        return (self.goal,self.num_expand,
+                {'Solutions':solutions,'Bound':round(bound,4)})
+
+    #******************************************************************
+    #  One weighted A* search, until no key in the open list is smaller
+    #  than the cost of the best solution. States improved after their
+    #  expansion in this search go in incons instead of the open list.
+    #
+    def improve_path(self):
+        (args,w,best) = (self.args,self.w,self.best)
+        heap = [(best[key].g + w*best[key].state.h,best[key].num,best[key])
+                for key in self.opened]
+        heapq.heapify(heap)
+        (push,pop) = heap_ops(args)
+        if not args.search_stats is None:
+            args.search_stats.resize(len(heap))
+        closed = set()
+        while heap:
+            (f,num,node) = heap[0]
+            if not self.goal is None and self.goal.g <= f:
+                break
+            pop(heap)
+            key = node.state.key()
+            if not key in self.opened or not best[key] is node:
+                continue
+            self.opened.remove(key)
+            closed.add(key)
+            self.num_expand += 1
+            check_limits(self.num_expand,args)
+            if args.v:
+                node.print_node_ghf(args,args.unique)
+            if args.search_stats is None:
+                children = node.state.expand()
+            else:
+                children = args.search_stats.expand(node.state)
+            for (state,act,cost) in children:
+                key = state.key()
+                g = node.g + cost
+                if key in best and best[key].g <= g:
+                    continue
+                child = Node(state,node,act,node.depth+1,g,args.s,args.w)
+                best[key] = child
+                if state.is_goal() and (self.goal is None or g < self.goal.g):
+                    self.goal = child
+                if key in closed:
+                    self.incons.add(key)
+                else:
+                    self.opened.add(key)
+                    push(heap,(g + w*state.h,child.num,child))
+        if not args.search_stats is None:
+            args.search_stats.resize(-len(heap))
+
+    #  cost of the goal over the smallest g + h of the open and
+    #  inconsistent states, which bounds the cost of any better
+    #  solution; at most w
+    def suboptimality(self):
+        lower = min([self.best[key].g + self.best[key].state.h
+                     for key in self.opened | self.incons],
+                    default=self.goal.g)
+        if lower <= 0 or self.goal.g <= lower:
+            return 1.0
+        return min(self.w,self.goal.g/lower)
+
+#**********************************************************************
+#  Search from start with ARA*, reporting each better solution.
+#
+def anytime_search( start, args, report=None ):
+    return ARAStar(start,args).search(report)
+
+def print_improvement( goal, w, bound, num_expand, seconds, args ):
+    out = args.out
+    if not args.quiet:
+        goal.print_path(out)
+        print(file=out)
+    print('[arastar w=%g]' % w,end=' ',file=out)
+    print('Cost:',goal.g,end='.',file=out)
+    print(' Bound: %.4g' % bound,end='.',file=out)
+    print(' Expanded:',num_expand,end='.',file=out)
+    print(' Time: %.3fs' % seconds,end='.',file=out)
+    print(flush=True,file=out)
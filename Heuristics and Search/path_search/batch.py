@@ -0,0 +1,88 @@
+#**********************************************************************
+#   batch.py
+#
+#   Batch mode for search.py: solve many start [goal] pairs with a pool
+#   of worker processes, each of which loads the environment (and any
+#   heuristic tables) once. One JSON line is printed per instance as
+#   soon as it is solved, in order of completion.
+#
+#   Each input line holds a start state and optionally a goal state,
+#   separated by a tab or comma (or by spaces, if neither is present).
+#   Blank lines and lines starting with # are skipped. A binary file of
+#   sliding tile boards written by instances.py is read as well.
+#
+#   python3 search.py --env sliding --s astar --h linear --closed \
+#                     --batch instances.txt --workers 4 --time_limit 10
+#
+import json
+import multiprocessing
+import os
+import sys
+
+worker = {}
+
+def solve_batch( args ):
+    args.quiet = True
+    args.v = False
+    workers = args.workers
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    instances = open_instances(args.batch)
+    if workers == 1:
+        init_worker(args)
+        results = map(solve_one,instances)
+        for result in results:
+            print(json.dumps(result),flush=True)
+    else:
+        with multiprocessing.Pool(workers,init_worker,(args,)) as pool:
+            for result in pool.imap_unordered(solve_one,instances):
+                print(json.dumps(result),flush=True)
+
+#**********************************************************************
+#  Yield (index,start,goal) for each instance in file; goal may be None.
+#
+def read_instances( file ):
+    index = 0
+    for line in file:
+        line = line.strip()
+        if line == '' or line.startswith('#'):
+            continue
+        if '\t' in line:
+            fields = line.split('\t')
+        elif ',' in line:
+            fields = line.split(',')
+        else:
+            fields = line.split()
+        fields = [f.strip() for f in fields]
+        goal = fields[1] if len(fields) > 1 and fields[1] != '' else None
+        yield (index,fields[0],goal)
+        index += 1
+
+#  the instances in the file at path (- for stdin), text or binary
+def open_instances( path ):
+    if path == '-':
+        return read_instances(sys.stdin)
+    from instances import MAGIC, read_binary
+    file = open(path,'rb')
+    header = file.read(16)
+    if header[:len(MAGIC)] == MAGIC:
+        return read_binary(file,header)
+    file.close()
+    return read_instances(open(path))
+
+def init_worker( args ):
+    from solver import Session
+    worker['args'] = args
+    worker['session'] = Session(args)
+
+#**********************************************************************
+#  Solve one instance and return its result as a dict (solver.Result).
+#  status is solved, unsolvable (search space exhausted), limit
+#  (--time_limit or --max_expand reached) or error (invalid start or
+#  goal). What the search prints is dropped by solver.py, to keep
+#  stdout as JSON lines.
+#
+def solve_one( instance ):
+    (index,start,goal) = instance
+    result = worker['session'].solve(worker['args'],start,goal)
+    return dict(index=index,**result.as_dict())
@@ -0,0 +1,48 @@
+#**********************************************************************
+#   bench_heap.py
+#
+#   Micro-benchmark comparing the priority queues in node_heap.py:
+#   insert and remove_min throughput of MyHeap, LazyHeap and BucketQueue.
+#
+#   python3 bench_heap.py --n 1000000
+#
+import argparse
+import random
+import sys
+import time
+
+from node_heap import Node, MyHeap, LazyHeap, BucketQueue
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n',type=int,default=200000,
+                        help='number of nodes to insert')
+    parser.add_argument('--range',type=int,default=100,
+                        help='costs are drawn from 0..range-1')
+    parser.add_argument('--seed',type=int,default=1,help='random seed')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    nodes = [Node(None,None,None,0,random.randrange(args.range),'ucs')
+             for k in range(args.n)]
+
+    for queue in [MyHeap('ucs'),LazyHeap('ucs'),BucketQueue('ucs')]:
+        t0 = time.perf_counter()
+        for node in nodes:
+            queue.insert(node)
+        t1 = time.perf_counter()
+        prev = None
+        while queue.size > 0:
+            node = queue.remove_min()
+            if not prev is None and (node.cost,node.num) < (prev.cost,prev.num):
+                print('Order violated by',type(queue).__name__)
+                sys.exit(1)
+            prev = node
+        t2 = time.perf_counter()
+        print('%-11s insert: %10.0f/s  remove_min: %10.0f/s'
+              % (type(queue).__name__,args.n/(t1-t0),args.n/(t2-t1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#**********************************************************************
+#   benchmark.py
+#
+#   Benchmark runner for the strategies of search.py on fixed instance
+#   sets, so that changes can be compared across commits by number.
+#
+#   Instance sets (--set), generated from --seed (2024 by default) so
+#   that they are the same on every run:
+#     3x3      --count random 3x3 puzzles (walks of 200 random moves)
+#     4x4      --count 4x4 puzzles, walks of --walk random moves from
+#              the goal (never undoing the last move)
+#     korf100  Korf's 100 random 15-puzzles (1985), read from --korf
+#              (korf100.txt by default, beside romania_map.csv; one
+#              puzzle per line, as 16 numbers with 0 the blank, the
+#              goal being 0 1 2 ... 15, after an optional number). Each
+#              is turned by 180 degrees and tile t relabelled 16-t,
+#              which moves its goal onto the standard goal (for which
+#              the pattern databases are built) without changing the
+#              optimal cost
+#     romania  all pairs of distinct cities of the romania environment
+#   or --instances: a file of start [goal] lines, or of boards written
+#   by instances.py (as for --batch), in the environment given by --env.
+#
+#   Each strategy in --s (a comma separated list) is run on the whole
+#   set in a fresh process, with the other options of search.py. For
+#   each instance the status, cost, nodes expanded and generated and
+#   wall time are recorded, and for each strategy the totals and the
+#   peak RSS of its process. --save writes these as JSON. --baseline
+#   compares them with a saved run: a change of status or cost, more
+#   nodes expanded or generated (beyond --tolerance), or more time or
+#   memory (beyond --time_tolerance, --rss_tolerance) is a regression,
+#   and the exit status is then 1.
+#
+#   python3 benchmark.py --set 3x3 --s astar,rbfs --h linear --save base.json
+#   python3 benchmark.py --set 3x3 --s astar,rbfs --h linear --baseline base.json
+#   python3 benchmark.py --set romania --s ucs,astar,biastar --h alt --closed
+#   python3 benchmark.py --set korf100 --s astar --h pdb --pdb 6-6-3 --closed
+#
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+
+SETS = ['3x3','4x4','korf100','romania']
+
+#**********************************************************************
+#  The (start,goal) pairs of an instance set, and their environment.
+#
+def instance_set( args ):
+    rng = random.Random(args.seed)
+    if not args.instances is None:
+        from batch import open_instances
+        pairs = [(start,goal) for (index,start,goal) in
+                 open_instances(args.instances)]
+        return (args.env,pairs)
+    elif args.set == '3x3':
+        return ('sliding',[(random_walk(3,3,200,rng),None)
+                           for k in range(args.count)])
+    elif args.set == '4x4':
+        return ('sliding',[(random_walk(4,4,args.walk,rng),None)
+                           for k in range(args.count)])
+    elif args.set == 'korf100':
+        if not os.path.exists(args.korf):
+            print("The korf100 set needs Korf's 100 puzzles in",args.korf,
+                  '(one per line, 16 numbers with 0 the blank), or --korf FILE')
+            sys.exit(1)
+        return ('sliding',korf_instances(args.korf))
+    elif args.set == 'romania':
+        from romania import adjacent
+        cities = sorted(adjacent)
+        return ('romania',[(a,b) for a in cities for b in cities if a != b])
+    print('Unknown instance set:',args.set)
+    sys.exit(1)
+
+#  a puzzle reached from the goal by random moves, none undoing the last
+def random_walk( rows, cols, moves, rng ):
+    from sliding import State
+    state = State.goal_state(rows,cols)
+    previous = None
+    for k in range(moves):
+        children = [child for (child,act,cost) in state.expand()
+                    if previous is None or not child.is_equal_to(previous)]
+        (previous,state) = (state,rng.choice(children))
+    return ''.join('%X' % t for t in state.a)
+
+#  Korf's puzzles in the file at path, relabelled for the standard goal
+def korf_instances( path ):
+    pairs = []
+    with open(path) as file:
+        for line in file:
+            numbers = line.split()
+            if len(numbers) < 16:
+                continue
+            tiles = [int(n) for n in numbers[-16:]]
+            tiles = [16 - t if t > 0 else 0 for t in reversed(tiles)]
+            pairs.append((''.join('%X' % t for t in tiles),None))
+    return pairs
+
+#**********************************************************************
+#  Solve every instance with one strategy, in a separate process so
+#  that its peak RSS is its own. Return the run as a dict.
+#
+def run_strategy( strategy, env, pairs, args ):
+    (receive,send) = multiprocessing.Pipe(False)
+    process = multiprocessing.Process(target=solve_all,
+                                      args=(strategy,env,pairs,args,send))
+    process.start()
+    send.close()
+    run = receive.recv()
+    process.join()
+    return run
+
+def solve_all( strategy, env, pairs, args, send ):
+    from solver import Session, make_args
+    options = {key:value for (key,value) in vars(args).items()
+               if not key in BENCHMARK_OPTIONS}
+    options.update(env=env,s=strategy,quiet=True,v=False)
+    query = make_args(**options)
+    session = Session(query)
+    instances = []
+    for (start,goal) in pairs:
+        result = session.solve(query,start,goal)
+        instances.append({key:getattr(result,key) for key in
+                          ['start','goal','status','cost','expanded',
+                           'generated','time']})
+    total = {'solved':sum(1 for i in instances if i['status'] == 'solved'),
+             'expanded':sum(i['expanded'] or 0 for i in instances),
+             'generated':sum(i['generated'] for i in instances),
+             'time':round(sum(i['time'] for i in instances),6),
+             'peak_rss_mb':round(resource.getrusage(
+                 resource.RUSAGE_SELF).ru_maxrss/1024,1)}
+    send.send({'total':total,'instances':instances})
+    send.close()
+
+#**********************************************************************
+#  Compare run with baseline, printing each difference. Return the
+#  number of regressions.
+#
+def compare( run, baseline, args ):
+    regressions = 0
+    for (strategy,new) in run['strategies'].items():
+        old = baseline['strategies'].get(strategy)
+        if old is None:
+            print('%-10s not in baseline' % strategy)
+            continue
+        changed = 0
+        for (a,b) in zip(old['instances'],new['instances']):
+            if (a['start'],a['goal']) != (b['start'],b['goal']):
+                print('%-10s instances differ from the baseline' % strategy)
+                changed += 1
+                break
+            if a['status'] != b['status'] or a['cost'] != b['cost']:
+                print('%-10s %s: %s %s -> %s %s' % (strategy,a['start'],
+                      a['status'],a['cost'],b['status'],b['cost']))
+                changed += 1
+        regressions += changed
+        for (key,tolerance,slack) in [
+                ('expanded',args.tolerance,0),
+                ('generated',args.tolerance,0),
+                ('time',args.time_tolerance,0.05),
+                ('peak_rss_mb',args.rss_tolerance,5)]:
+            a = old['total'][key]
+            b = new['total'][key]
+            change = (b - a)/a if a > 0 else 0.0
+            worse = b > a*(1 + tolerance) and b - a > slack
+            print('%-10s %-12s %12s -> %-12s %+7.1f%%  %s' % (strategy,key,
+                  a,b,100*change,'REGRESSION' if worse else 'ok'))
+            regressions += worse
+    return regressions
+
+BENCHMARK_OPTIONS = ['set','instances','count','walk','seed','korf','save',
+                     'baseline','tolerance','time_tolerance','rss_tolerance']
+
+def main():
+    from search import make_parser
+    parser = make_parser()
+    parser.set_defaults(s='astar',seed=2024)
+    parser.add_argument('--set',type=str,default='3x3',
+                        help='instance set: ' + ', '.join(SETS))
+    parser.add_argument('--instances',type=str,default=None,
+                        help='file of start [goal] lines instead of --set')
+    parser.add_argument('--count',type=int,default=100,
+                        help='instances in the 3x3 and 4x4 sets')
+    parser.add_argument('--walk',type=int,default=60,
+                        help='random moves from the goal for the 4x4 set')
+    parser.add_argument('--korf',type=str,default='korf100.txt',
+                        help="file of Korf's 100 puzzles for --set korf100")
+    parser.add_argument('--save',type=str,default=None,
+                        help='write the results to this JSON file')
+    parser.add_argument('--baseline',type=str,default=None,
+                        help='compare with the results saved in this file')
+    parser.add_argument('--tolerance',type=float,default=0.0,
+                        help='allowed increase in nodes expanded/generated')
+    parser.add_argument('--time_tolerance',type=float,default=0.25,
+                        help='allowed increase in total time')
+    parser.add_argument('--rss_tolerance',type=float,default=0.25,
+                        help='allowed increase in peak RSS')
+    args = parser.parse_args()
+
+    (env,pairs) = instance_set(args)
+    name = args.set if args.instances is None else args.instances
+    print('%s: %d instances' % (name,len(pairs)),flush=True)
+    run = {'set':name,'seed':args.seed,
+           'options':{key:value for (key,value) in sorted(vars(args).items())
+                      if not key in BENCHMARK_OPTIONS and key != 's'},
+           'python':platform.python_version(),
+           'date':time.strftime('%Y-%m-%d %H:%M:%S'),
+           'strategies':{}}
+    for strategy in args.s.split(','):
+        result = run_strategy(strategy,env,pairs,args)
+        run['strategies'][strategy] = result
+        total = result['total']
+        print('%-10s solved %d/%d  expanded %d  generated %d  time %.2fs'
+              '  peak RSS %.1fMB' % (strategy,total['solved'],len(pairs),
+              total['expanded'],total['generated'],total['time'],
+              total['peak_rss_mb']),flush=True)
+    if not args.save is None:
+        with open(args.save,'w') as file:
+            json.dump(run,file,indent=1)
+    if not args.baseline is None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(run,baseline,args)
+        print('Regressions:',regressions)
+        if regressions > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#**********************************************************************
+#   bidirectional.py
+#
+#   Bidirectional search strategies for search.py, searching forward
+#   from the start state and backward (with reverse_expand) from the
+#   goal state until the two searches meet.
+#
+#   bibfs    breadth first from both ends, one whole layer at a time
+#   biucs    uniform cost from both ends (bidirectional Dijkstra)
+#   biastar  MM: nodes are ordered by max(g+h, 2g), where h estimates
+#            the distance to the goal going forward and to the start
+#            going backward (State.h_to)
+#
+import random
+
+from node_heap import Node, LazyHeap
+from limits import check_limits
+
+#**********************************************************************
+#  Search from start towards its goal state. Return the goal node of
+#  the path found (or None), and the number of nodes expanded in each
+#  direction.
+#
+def bidirectional_search( start, args ):
+    goal = Node(start.state.target_state(),None,None,0,0,args.s,args.w,
+                start.counters)
+    if args.s == 'bibfs':
+        return bidirectional_bfs(start,goal,args)
+    else:
+        return bidirectional_best_first(start,goal,args)
+
+#**********************************************************************
+#  Children of state going forward (d = 0) or backward (d = 1).
+#  Going backward, the action is the one leading to state.
+#
+def successors( state, d, args ):
+    if not args.search_stats is None:
+        children = args.search_stats.expand(state,d == 1)
+    elif d == 0:
+        children = state.expand()
+    else:
+        children = state.reverse_expand()
+    if args.shuffle:
+        random.shuffle(children)
+    return children
+
+#**********************************************************************
+#  Expand the smaller frontier one whole layer at a time. Once a layer
+#  meets the other search, the shortest connection within the layer
+#  is a shortest path.
+#
+def bidirectional_bfs( start, goal, args ):
+    expanded = [0,0]
+    seen = [{start.state.key():start},{goal.state.key():goal}]
+    if start.state.key() in seen[1]:
+        return (start,expanded)
+    layer = [[start],[goal]]
+    if not args.search_stats is None:
+        args.search_stats.resize(2)
+    meet = None
+    while layer[0] and layer[1] and meet is None:
+        d = 0 if len(layer[0]) <= len(layer[1]) else 1
+        other = seen[1-d]
+        next_layer = []
+        for node in layer[d]:
+            expanded[d] += 1
+            check_limits(expanded[0] + expanded[1],args)
+            if args.v:
+                node.print_node_ghf(args,args.unique)
+            for (state,act,cost) in successors(node.state,d,args):
+                key = state.key()
+                if key in seen[d]:
+                    continue
+                child = Node(state,node,act,node.depth+1,node.g+cost,
+                             args.s,args.w)
+                seen[d][key] = child
+                next_layer.append(child)
+                if key in other:
+                    length = child.depth + other[key].depth
+                    if meet is None or length < meet[0]:
+                        meet = (length,child,other[key])
+        if not args.search_stats is None:
+            args.search_stats.resize(len(next_layer) - len(layer[d]))
+        layer[d] = next_layer
+    if meet is None:
+        return (None,expanded)
+    (length,a,b) = meet
+    if d == 0:
+        return (join(a,b,args),expanded)
+    else:
+        return (join(b,a,args),expanded)
+
+#**********************************************************************
+#  Best first search from both ends, always expanding the direction
+#  whose queue has the lower minimum. U is the cost of the best path
+#  found so far. biucs stops once the two minimum g values add up to
+#  U or more; biastar stops once U is no more than the lower of the
+#  two minimum priorities, which bounds the cost of any path not yet
+#  found (MM stopping rule).
+#
+def bidirectional_best_first( start, goal, args ):
+    expanded = [0,0]
+    target = [goal.state,start.state]
+    heap = [LazyHeap(args.s,args.w),LazyHeap(args.s,args.w)]
+    if not args.search_stats is None:
+        heap = [args.search_stats.watch_queue(queue) for queue in heap]
+    best = [{},{}]
+    for (d,node) in [(0,start),(1,goal)]:
+        node.cost = priority(node,d,target,args)
+        best[d][node.state.key()] = node
+        heap[d].insert(node,node.state.key())
+    if start.state.key() in best[1]:
+        return (start,expanded)
+    U = float('inf')
+    meet = None
+    while heap[0].size > 0 and heap[1].size > 0:
+        top = [heap[0].min_cost(),heap[1].min_cost()]
+        if args.s == 'biucs':
+            if top[0] + top[1] >= U:
+                break
+        elif min(top) >= U:
+            break
+        d = 0 if top[0] <= top[1] else 1
+        node = heap[d].remove_min()
+        expanded[d] += 1
+        check_limits(expanded[0] + expanded[1],args)
+        if args.v:
+            node.print_node_ghf(args,args.unique)
+        for (state,act,cost) in successors(node.state,d,args):
+            key = state.key()
+            g = node.g + cost
+            if key in best[d] and best[d][key].g <= g:
+                continue
+            child = Node(state,node,act,node.depth+1,g,args.s,args.w)
+            child.cost = priority(child,d,target,args)
+            best[d][key] = child
+            heap[d].insert(child,key)
+            other = best[1-d].get(key)
+            if not other is None and g + other.g < U:
+                U = g + other.g
+                meet = (child,other) if d == 0 else (other,child)
+    if meet is None:
+        return (None,expanded)
+    return (join(meet[0],meet[1],args),expanded)
+
+def priority( node, d, target, args ):
+    if args.s == 'biucs':
+        return node.g
+    if d == 0:
+        h = node.state.h
+    else:
+        h = node.state.h_to(target[1])
+    return max(node.g + h,2*node.g)
+
+#**********************************************************************
+#  Join forward node a and backward node b, which hold the same state,
+#  into a single chain of forward nodes ending at the goal.
+#
+def join( a, b, args ):
+    tick = a.counters.tick                # not counted as generated
+    node = a
+    while not b.parent is None:
+        p = b.parent
+        node = Node(p.state,node,b.action,node.depth+1,node.g + b.g - p.g,
+                    args.s,args.w)
+        b = p
+    a.counters.tick = tick
+    return node
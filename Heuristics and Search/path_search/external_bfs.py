@@ -0,0 +1,230 @@
+#**********************************************************************
+#   external_bfs.py
+#
+#   Disk based layered breadth first search of the sliding tile puzzle,
+#   for state spaces whose layers do not fit in memory. Works like
+#   layered_bfs.py, but each layer is a sorted binary file of packed
+#   states (uint64), with a file of move codes alongside, in a directory
+#   of its own within --ebfs_dir (so that runs may share --ebfs_dir).
+#
+#   The current layer is read through np.memmap in chunks. The new
+#   children of each chunk (those not in the previous layer, which is
+#   searched through its memmap) are sorted and written out as a run.
+#   The runs are then merged block by block into the next layer,
+#   dropping states found in more than one run. The chunk and block
+#   sizes follow from --memory (MB), which bounds the arrays held in
+#   memory. Layer files are only read through memmap, whose pages the
+#   system can drop and re-read, so a large search slows down to disk
+#   speed rather than running out of memory.
+#
+#   python3 search.py --env sliding --s ebfs --start 867254301 --memory 64
+#   python3 external_bfs.py --rows 3 --cols 4 --memory 256
+#
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from layered_bfs import Layers, contains, follow, unique
+from limits import check_limits
+
+class ExternalLayers:
+
+    def __init__(self,rows,cols,work_dir,memory=1024):
+        budget = memory << 20
+        # a chunk of states has up to 4 children, each 9 bytes with its
+        # move code, and sorting them takes about 3 copies
+        self.chunk = max(1024,budget // (4*9*3))
+        self.L = Layers(rows,cols,self.chunk)
+        self.budget = budget
+        os.makedirs(work_dir,exist_ok=True)
+        self.base_dir = work_dir
+        self.work_dir = tempfile.mkdtemp(prefix='ebfs-',dir=work_dir)
+
+    def path(self,name,d,kind):
+        return os.path.join(self.work_dir,'%s-%03d.%s' % (name,d,kind))
+
+    def read(self,name,d):
+        path = self.path(name,d,'bin')
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return (np.zeros(0,dtype=np.uint64),np.zeros(0,dtype=np.uint8))
+        return (np.memmap(path,dtype=np.uint64,mode='r'),
+                np.memmap(self.path(name,d,'code'),dtype=np.uint8,mode='r'))
+
+    def write(self,name,d,states,codes):
+        with open(self.path(name,d,'bin'),'wb') as file:
+            states.tofile(file)
+        with open(self.path(name,d,'code'),'wb') as file:
+            codes.tofile(file)
+
+    def remove(self,name,d):
+        for kind in ['bin','code']:
+            if os.path.exists(self.path(name,d,kind)):
+                os.remove(self.path(name,d,kind))
+
+    #******************************************************************
+    #  Write layer d+1 from layers d and d-1. Return its size and the
+    #  number of children generated.
+    #
+    def next_layer(self,d):
+        (layer,c) = self.read('layer',d)
+        (prev,c) = self.read('layer',d-1)
+        generated = 0
+        runs = 0
+        for c0 in range(0,len(layer),self.chunk):
+            p = np.array(layer[c0:c0+self.chunk])
+            (states,codes,count) = self.L.next_layer(p,prev)
+            generated += count
+            self.write('run',runs,states,codes)
+            runs += 1
+        size = self.merge(runs,d+1)
+        for r in range(runs):
+            self.remove('run',r)
+        return (size,generated)
+
+    #******************************************************************
+    #  Merge sorted runs into layer d. Each step takes from every run
+    #  the states up to the smallest last state of the runs' next
+    #  blocks, so no state is split between steps.
+    #
+    def merge(self,runs,d):
+        files = [self.read('run',r) for r in range(runs)]
+        block = max(1024,self.budget // (max(runs,1)*9*3))
+        pos = [0]*runs
+        size = 0
+        with open(self.path('layer',d,'bin'),'wb') as out, \
+             open(self.path('layer',d,'code'),'wb') as out_codes:
+            while True:
+                live = [r for r in range(runs) if pos[r] < len(files[r][0])]
+                if not live:
+                    break
+                cutoff = None
+                for r in live:
+                    end = pos[r] + block
+                    if end < len(files[r][0]):
+                        last = files[r][0][end-1]
+                        if cutoff is None or last < cutoff:
+                            cutoff = last
+                states = []
+                codes = []
+                for r in live:
+                    (s,c) = files[r]
+                    if cutoff is None:
+                        end = len(s)
+                    else:
+                        end = pos[r] + int(np.searchsorted(
+                            s[pos[r]:pos[r]+block],cutoff,side='right'))
+                    states.append(np.array(s[pos[r]:end]))
+                    codes.append(np.array(c[pos[r]:end]))
+                    pos[r] = end
+                (states,codes) = unique(np.concatenate(states),
+                                       np.concatenate(codes))
+                states.tofile(out)
+                codes.tofile(out_codes)
+                size += len(states)
+        return size
+
+    #  remove the directory of this run, and the directory given if that
+    #  empties it
+    def clear(self):
+        shutil.rmtree(self.work_dir,ignore_errors=True)
+        try:
+            os.rmdir(self.base_dir)
+        except OSError:                 # still used by another run
+            pass
+
+#**********************************************************************
+#  Search from start (a sliding Node) for its goal, keeping every layer
+#  on disk. Return the goal node and the number of states expanded.
+#
+def external_search( start, args ):
+    geo = start.state.geo
+    E = ExternalLayers(geo.rows,geo.cols,args.ebfs_dir,args.memory)
+    goal = np.array([geo.goal_p],dtype=np.uint64)
+    E.write('layer',0,np.array([start.state.p],dtype=np.uint64),
+            np.zeros(1,dtype=np.uint8))
+    E.remove('layer',-1)
+    d = 0
+    size = 1
+    num_expand = 0
+    generated = 0
+    try:
+        while size > 0 and not contains(E.read('layer',d)[0],goal)[0]:
+            num_expand += size
+            check_limits(num_expand,args)
+            (size,count) = E.next_layer(d)
+            generated += count
+            d += 1
+            if not args.quiet:
+                print('depth:',d,end='.',file=args.out)
+                print(' States:',size,file=args.out)
+        if size == 0:
+            start.counters.tick = generated
+            return (None,num_expand)
+        moves = []
+        p = goal
+        for k in range(d,0,-1):
+            (layer,codes) = E.read('layer',k)
+            code = np.array(codes[np.searchsorted(layer,p)])
+            moves.append(int(code[0]))
+            p = E.L.parents(p,code)
+        moves.reverse()
+    finally:
+        E.clear()
+    node = follow(start,moves,args)
+    start.counters.tick = generated
+    return (node,num_expand)
+
+#**********************************************************************
+#  Enumerate all states reachable from the goal, keeping only the last
+#  two layers on disk.
+#
+def enumerate_layers( rows, cols, work_dir, memory ):
+    E = ExternalLayers(rows,cols,work_dir,memory)
+    goal = list(range(1,rows*cols)) + [0]
+    p = 0
+    for k in range(rows*cols):
+        p |= goal[k] << (4*k)
+    E.write('layer',0,np.array([p],dtype=np.uint64),np.zeros(1,dtype=np.uint8))
+    E.remove('layer',-1)
+    total = 0
+    peak = 0
+    depth = 0
+    size = 1
+    t0 = time.time()
+    try:
+        while size > 0:
+            print('depth %3d: %12d  (%.1fs)' % (depth,size,time.time()-t0))
+            total += size
+            peak = max(peak,size)
+            size = E.next_layer(depth)[0]
+            E.remove('layer',depth-1)
+            depth += 1
+    finally:
+        E.clear()
+    print('Total:',total,end='.')
+    print(' Largest layer:',peak,end='.')
+    print(' Radius:',depth-1,end='.')
+    print(' Time: %.1fs' % (time.time()-t0))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows',type=int,default=3,
+                        help='rows in sliding tile puzzle')
+    parser.add_argument('--cols',type=int,default=0,
+                        help='cols in sliding tile puzzle')
+    parser.add_argument('--memory',type=int,default=1024,
+                        help='memory for arrays (MB)')
+    parser.add_argument('--ebfs_dir',type=str,default='ebfs',
+                        help='directory for the layer files')
+    args = parser.parse_args()
+    cols = args.cols if args.cols > 0 else args.rows
+    enumerate_layers(args.rows,cols,args.ebfs_dir,args.memory)
+
+
+if __name__ == '__main__':
+    main()
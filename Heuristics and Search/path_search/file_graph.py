@@ -0,0 +1,330 @@
+#**********************************************************************
+#   file_graph.py
+#
+#   A weighted graph loaded from a file, in a format used by the path
+#   search algorithms implemented in search.py:
+#
+#   python3 search.py --env file --graph romania_map.csv --s astar \
+#                     --start arad --goal bucharest
+#
+#   The graph is held in compressed sparse row (CSR) form: the edges
+#   leaving node v are indices[indptr[v]:indptr[v+1]], with costs in
+#   weights[...], where nodes are numbered 0..n-1 in order of first
+#   appearance. A reverse CSR holds the edges entering each node, for
+#   backward search. After the first load, the arrays are cached next
+#   to the file as <file>.npz, which is reused while it is newer than
+#   the file, and was made with the same coordinate file (path and
+#   modification time) or none.
+#
+#   File formats:
+#     text     one edge per line: a b [cost], separated by commas if the
+#              line has any, otherwise by white space (cost defaults
+#              to 1). Edges are undirected unless --directed is given.
+#     DIMACS   files ending in .gr, with arc lines: a u v cost
+#
+#   Node coordinates are read from the file given by --coords, or else
+#   from the file of the same name ending in .co if there is one, with
+#   lines name x y (text) or v id x y (DIMACS). With coordinates, the
+#   heuristic is the straight line distance to the goal, scaled by the
+#   smallest ratio of cost to length over all edges, which keeps it
+#   admissible (and consistent) whatever the units of the two.
+#
+import os
+import sys
+
+import numpy as np
+
+class Graph:
+
+    def __init__(self,names,arrays):
+        self.names = names
+        self.n = len(names)
+        self.ids = None            # name -> node, made when first needed
+        for (key,a) in arrays.items():
+            setattr(self,key,a)
+        self.has_coords = len(self.x) == self.n
+        self.scale = self.edge_scale() if self.has_coords else 0.0
+
+    #******************************************************************
+    #  Load the graph from path, using its cache if it is up to date.
+    #
+    def load(path,directed=False,coords=None):
+        if not os.path.exists(path):
+            sys.exit('No such graph file: %s' % path)
+        dimacs = path.endswith('.gr')
+        if coords is None:
+            coords = os.path.splitext(path)[0] + '.co'
+            if not os.path.exists(coords):
+                coords = None
+        if coords is None:
+            source = ('',0.0)
+        else:
+            source = (os.path.abspath(coords),os.path.getmtime(coords))
+        cache = path + '.npz'
+        if (os.path.exists(cache) and
+            os.path.getmtime(cache) >= os.path.getmtime(path)):
+            data = np.load(cache)
+            if ('coords' in data.files and
+                bool(data['directed']) == (directed or dimacs) and
+                (str(data['coords']),float(data['coords_mtime'])) == source):
+                arrays = {key:data[key] for key in Graph.ARRAYS}
+                return Graph(data['names'],arrays)
+        graph = Graph.parse(path,dimacs,directed or dimacs,coords)
+        try:
+            np.savez(cache,names=graph.names,directed=directed or dimacs,
+                     coords=source[0],coords_mtime=source[1],
+                     **{key:getattr(graph,key) for key in Graph.ARRAYS})
+        except OSError as error:
+            print('Could not cache graph:',error,file=sys.stderr)
+        return graph
+
+    #******************************************************************
+    #  The graph of an adjacency dict {a:[(b,cost),...]} (romania, graph).
+    #
+    def from_adjacency(adjacent):
+        ids = {}
+        src = []
+        dst = []
+        cost = []
+        for (a,edges) in adjacent.items():
+            for (b,c) in edges:
+                src.append(ids.setdefault(a,len(ids)))
+                dst.append(ids.setdefault(b,len(ids)))
+                cost.append(c)
+        src = np.array(src,dtype=np.int64)
+        dst = np.array(dst,dtype=np.int64)
+        cost = np.array(cost)
+        arrays = {'x':np.zeros(0),'y':np.zeros(0)}
+        (arrays['indptr'],arrays['indices'],arrays['weights']) = csr(
+            src,dst,cost,len(ids))
+        (arrays['rindptr'],arrays['rindices'],arrays['rweights']) = csr(
+            dst,src,cost,len(ids))
+        return Graph(np.array(list(ids)),arrays)
+
+    ARRAYS = ['indptr','indices','weights','rindptr','rindices','rweights',
+              'x','y']
+
+    #******************************************************************
+    #  Parse the edge (and coordinate) files.
+    #
+    def parse(path,dimacs,directed,coords):
+        ids = {}
+        src = []
+        dst = []
+        cost = []
+        for fields in read_fields(path):
+            if dimacs:
+                if fields[0] != 'a':
+                    continue
+                fields = fields[1:]
+            if len(fields) < 2:
+                sys.exit('Bad edge in %s : %s' % (path,' '.join(fields)))
+            src.append(ids.setdefault(fields[0],len(ids)))
+            dst.append(ids.setdefault(fields[1],len(ids)))
+            cost.append(fields[2] if len(fields) > 2 else '1')
+        if dimacs:                      # keep DIMACS node numbers as names
+            names = [str(i) for i in range(1,max(map(int,ids))+1)]
+            number = np.array([int(name)-1 for name in ids],dtype=np.int64)
+            src = number[src]
+            dst = number[dst]
+            ids = {name:i for (i,name) in enumerate(names)}
+        else:
+            names = list(ids)
+        n = len(names)
+        src = np.asarray(src,dtype=np.int64)
+        dst = np.asarray(dst,dtype=np.int64)
+        weights = np.array(cost,dtype=np.float64)
+        if np.all(weights == np.round(weights)):
+            weights = weights.astype(np.int64)
+        if not directed:
+            (src,dst) = (np.concatenate([src,dst]),np.concatenate([dst,src]))
+            weights = np.concatenate([weights,weights])
+        x = np.zeros(0)
+        y = np.zeros(0)
+        if not coords is None:
+            x = np.full(n,np.nan)
+            y = np.full(n,np.nan)
+            for fields in read_fields(coords):
+                if dimacs:
+                    if fields[0] != 'v':
+                        continue
+                    fields = fields[1:]
+                if fields[0] in ids:
+                    x[ids[fields[0]]] = float(fields[1])
+                    y[ids[fields[0]]] = float(fields[2])
+            if np.isnan(x).any():
+                print('Missing coordinates in',coords,'- no heuristic.',
+                      file=sys.stderr)
+                x = np.zeros(0)
+                y = np.zeros(0)
+        arrays = {'x':x,'y':y}
+        (arrays['indptr'],arrays['indices'],arrays['weights']) = csr(
+            src,dst,weights,n)
+        (arrays['rindptr'],arrays['rindices'],arrays['rweights']) = csr(
+            dst,src,weights,n)
+        return Graph(np.array(names),arrays)
+
+    #******************************************************************
+    #  Largest factor s such that s times the length of every edge is
+    #  at most its cost.
+    #
+    def edge_scale(self):
+        src = np.repeat(np.arange(self.n),np.diff(self.indptr))
+        length = np.hypot(self.x[src] - self.x[self.indices],
+                          self.y[src] - self.y[self.indices])
+        long = length > 0
+        if not long.any():
+            return 0.0
+        scale = float(np.min(self.weights[long]/length[long]))
+        return max(scale*(1 - 1e-9),0.0)    # margin for rounding
+
+    def node_id(self,name):
+        if self.ids is None:
+            self.ids = {str(name):v for (v,name)
+                        in enumerate(self.names.tolist())}
+        if not name in self.ids:
+            sys.exit('Unknown node: %s' % name)
+        return self.ids[name]
+
+    #  straight line estimates of the distance from every node to v
+    def distances_to(self,v):
+        if not self.has_coords:
+            return None
+        return self.scale*np.hypot(self.x - self.x[v],self.y - self.y[v])
+
+    def distance(self,u,v):
+        if not self.has_coords:
+            return 0
+        return self.scale*float(np.hypot(self.x[u] - self.x[v],
+                                         self.y[u] - self.y[v]))
+
+#**********************************************************************
+#   Yield the fields of each line of a file, skipping blank lines and
+#   comments (# or DIMACS c and p lines).
+#
+def read_fields( path ):
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if line == '' or line[0] == '#' or line[:2] in ['c ','p ']:
+                continue
+            if ',' in line:
+                yield [f.strip() for f in line.split(',')]
+            else:
+                yield line.split()
+
+#**********************************************************************
+#   Compressed sparse row arrays for the edges src[i] -> dst[i].
+#
+def csr( src, dst, weights, n ):
+    order = np.argsort(src,kind='stable')
+    indptr = np.zeros(n+1,dtype=np.int64)
+    np.cumsum(np.bincount(src,minlength=n),out=indptr[1:])
+    return (indptr,dst[order],weights[order])
+
+
+class State:
+
+    __slots__ = ('v','h')
+
+    graph = None
+    goal = None
+    goal_h = None
+    landmarks = None
+
+    def __init__(self,v):
+        self.v = v
+        if State.goal_h is None:
+            self.h = 0
+        else:
+            self.h = float(State.goal_h[v])
+
+    def load(args):
+        if args.graph is None:
+            sys.exit('--env file needs --graph')
+        State.graph = Graph.load(args.graph,args.directed,args.coords)
+        State.set_goal(None)
+
+    #  straight (default): straight line distance, if there are coordinates
+    #  alt: the larger of that and the landmark bound (landmarks.py)
+    def set_heuristic(name,args):
+        if name == 'straight':
+            State.landmarks = None
+        elif name == 'alt':
+            from landmarks import Landmarks
+            graph_name = os.path.basename(args.graph)
+            State.landmarks = Landmarks.load(State.graph,graph_name,
+                                             args.landmarks,args.alt_dir)
+        else:
+            sys.exit('Unknown heuristic: %s' % name)
+        State.set_goal(None if State.goal is None
+                       else str(State.graph.names[State.goal]))
+
+    def start_state(args):
+        if args.start is None:
+            return State(0)
+        else:
+            return State(State.graph.node_id(args.start))
+
+    def set_goal(goal):
+        graph = State.graph
+        if goal is None:
+            State.goal = graph.n - 1
+        else:
+            State.goal = graph.node_id(goal)
+        State.goal_h = graph.distances_to(State.goal)
+        if not State.landmarks is None:
+            alt = State.landmarks.bounds_to(State.goal)
+            if State.goal_h is None:
+                State.goal_h = alt
+            else:
+                State.goal_h = np.fmax(State.goal_h,alt)
+
+    def is_equal_to(self,other):
+        return(self.v == other.v)
+
+    def key(self):
+        return self.v
+
+    def expand( self ):
+        g = State.graph
+        a = g.indptr[self.v]
+        b = g.indptr[self.v+1]
+        children = []
+        for (v,cost) in zip(g.indices[a:b].tolist(),g.weights[a:b].tolist()):
+            children.append((State(v),'-',cost))
+        return children
+
+    def reverse_expand( self ):
+        g = State.graph
+        a = g.rindptr[self.v]
+        b = g.rindptr[self.v+1]
+        children = []
+        for (v,cost) in zip(g.rindices[a:b].tolist(),
+                            g.rweights[a:b].tolist()):
+            children.append((State(v),'-',cost))
+        return children
+
+    def target_state( self ):
+        return State(State.goal)
+
+    def h_to( self, other ):
+        h = State.graph.distance(self.v,other.v)
+        if not State.landmarks is None:
+            h = max(h,State.landmarks.bound(self.v,other.v))
+        return h
+
+    def is_goal( self ):
+        return self.v == State.goal
+
+    def heuristic( self ):
+        return self.h
+
+    def print_action(self,action,file=None):
+        print('->',end='',file=file)
+
+    def print_state(self,file=None):
+        print(str(self),end='',file=file)
+
+    def __str__(self):
+        return str(State.graph.names[self.v])
@@ -9,6 +9,8 @@
 import numpy as np
 import random
 
+from map_state import MapState, reverse_adjacency
+
 adjacent = {
     'A':[('B',2),('C',2),('D',4),('S',2),('T',6)],
     'B':[('A',2),('T',5)],
@@ -29,40 +31,15 @@ adjacent = {
 heuristic = {'A':9,'B':7,'C':7,'D':7,'E':4,'F':3,'G':0,
              'S':9,'T':8,'U':7,'V':7,'W':2,'X':5,'Y':5,'Z':1}
 
-class State:
-
-    goal = 'G'
-    
-    def __init__(self,a='S'):
-        self.a = a
-        self.h = heuristic[a]
-        
-    def start_state(args):
-        if args.start is None:
-            return State('S')
-        else:
-            return State(args.start)
-        
-    def set_goal(goal):
-        State.goal = goal
-    
-    def is_equal_to(self,other):
-        return(self.a == other.a)
-
-    def expand( self ):
-        children = []
-        for (state,cost) in adjacent[self.a]:
-            children.append((State(state),'-',cost))
-        return children
-
-    def is_goal( self ):
-        return self.a == State.goal
+class State(MapState):
 
-    def heuristic( self ):
-        return heuristic[self.a]
-        
-    def print_action(self,action):
-        print('->',end='')
+    adjacent = adjacent
+    reverse_adjacent = reverse_adjacency(adjacent)
+    fixed_table = heuristic
+    map_name = 'graph'
+    default_start = 'S'
+    default_goal = 'G'
 
-    def print_state(self):
-        print(self.a,end='')
+    goal = default_goal
+    table = heuristic
+    landmarks = None
@@ -0,0 +1,258 @@
+#**********************************************************************
+#   hda_star.py
+#
+#   Hash Distributed A* (HDA*) for search.py: A* shared between
+#   --hda_workers processes (one per cpu by default). Each state is owned
+#   by the worker given by a hash of its key, which keeps the open list
+#   and best g of its own states. A worker expands its best node and
+#   sends each child to its owner, in batches of --hda_batch children.
+#
+#   A solution found by any worker bounds the cost of the others: it
+#   is broadcast, and nodes with f no smaller are not expanded. The
+#   search ends when every worker is idle (no open node with f below
+#   the bound) and every message sent has been received, which is
+#   checked twice in a row from shared counters. The best solution is
+#   then optimal (with an admissible heuristic), and its path is traced
+#   back through the owners of its states. A worker of --batch or
+#   server.py is a daemon process, which cannot start the processes of
+#   HDA*, so there hdastar is an error.
+#
+#   python3 search.py --env sliding --start 16D75034BA8E29CF --s hdastar --hda_workers 4
+#   python3 search.py --env romania --s hdastar --start zerind --hda_workers 2
+#
+import heapq
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import zlib
+
+from node_heap import Node
+from limits import check_limits
+
+MASK = (1 << 64) - 1
+
+#  the worker owning key, out of n
+def owner( key, n ):
+    if isinstance(key,int):
+        return (((key*0x9E3779B97F4A7C15) & MASK) >> 32) % n
+    return zlib.crc32(str(key).encode()) % n
+
+#**********************************************************************
+#  Search from start. Return the goal node (or None), the number of
+#  nodes expanded by all workers, and the number of workers, expansion
+#  rate and load balance (largest over mean expansions per worker).
+#
+def parallel_search( start, args ):
+    if multiprocessing.current_process().daemon:
+        sys.exit('hdastar cannot run in a worker of --batch or server.py.')
+    n = args.hda_workers if args.hda_workers > 0 else (os.cpu_count() or 1)
+    worker_args = argparse_copy(args)
+    worker_args.goal = str(start.state.target_state())   # may not be in args
+    inboxes = [multiprocessing.Queue() for i in range(n)]
+    results = multiprocessing.Queue()
+    counters = multiprocessing.Array('q',2)   # messages sent, received
+    idle = multiprocessing.Array('b',n)
+    workers = [multiprocessing.Process(target=run_worker,daemon=True,
+                                       args=(i,worker_args,inboxes,results,
+                                             counters,idle))
+               for i in range(n)]
+    t0 = time.perf_counter()
+    for process in workers:
+        process.start()
+    try:
+        send(inboxes,owner(start.state.key(),n),counters,
+             [(0,0,start.state,None,None)])
+        (cost,goal_key,expanded) = wait_for_workers(inboxes,results,counters,
+                                                    idle,workers,args)
+        path = [] if goal_key is None else trace(goal_key,inboxes,results)
+        generated = 0
+        for inbox in inboxes:
+            inbox.put(('stop',))
+        for k in range(n):
+            message = next_message(results,'done',workers)
+            expanded[message[1]] = message[2]
+            generated += message[3]
+    finally:
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+        for process in workers:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+    seconds = time.perf_counter() - t0
+    num_expand = sum(expanded)
+    node = None
+    for (g,depth,state,parent_key,action) in reversed(path):
+        if node is None:
+            node = start
+        else:
+            node = Node(state,node,action,depth,g,args.s,args.w)
+    start.counters.tick = generated + 1
+    return (node,num_expand,
+            {'Workers':n,'Expanded/s':int(num_expand/max(seconds,1e-9)),
+             'Load balance':round(max(expanded)*n/max(num_expand,1),2)})
+
+#  args for the workers, without what only this process uses
+def argparse_copy( args ):
+    import argparse
+    copy = argparse.Namespace(**vars(args))
+    copy.search_stats = None
+    copy.out = None
+    copy.counters = None
+    return copy
+
+#  count a message to the workers (children or a goal report) as sent,
+#  then send it
+def send( inboxes, j, counters, batch ):
+    with counters.get_lock():
+        counters[0] += 1
+    inboxes[j].put(('nodes',batch))
+
+#**********************************************************************
+#  Gather goal reports (broadcasting better bounds) until the workers
+#  are done. Return the best cost, the key of its goal state (or None)
+#  and the expansions reported by each worker.
+#
+def wait_for_workers( inboxes, results, counters, idle, workers, args ):
+    n = len(inboxes)
+    cost = float('inf')
+    goal_key = None
+    expanded = [0]*n
+    last = None
+    while True:
+        try:
+            message = results.get(timeout=0.01)
+        except queue.Empty:
+            message = None
+        if not message is None:
+            if message[0] == 'goal':
+                with counters.get_lock():
+                    counters[1] += 1
+                if message[1] < cost:
+                    (cost,goal_key) = message[1:3]
+                    for inbox in inboxes:
+                        inbox.put(('bound',cost))
+            elif message[0] == 'progress':
+                expanded[message[1]] = message[2]
+            continue
+        check_limits(sum(expanded),args)
+        if not all(process.is_alive() for process in workers):
+            sys.exit('A worker process died.')
+        with counters.get_lock():
+            snapshot = (tuple(idle),counters[0],counters[1])
+        if all(snapshot[0]) and snapshot[1] == snapshot[2] and \
+           snapshot == last:
+            return (cost,goal_key,expanded)
+        last = snapshot
+
+#  the next message of the given kind from results, skipping others
+def next_message( results, kind, workers ):
+    while True:
+        try:
+            message = results.get(timeout=1)
+        except queue.Empty:
+            if not all(process.is_alive() for process in workers):
+                sys.exit('A worker process died.')
+            continue
+        if message[0] == kind:
+            return message
+
+#  the entries (g,depth,state,parent_key,action) of the states on the
+#  path to the goal state with key, from the goal back to the start
+def trace( key, inboxes, results ):
+    path = []
+    while not key is None:
+        inboxes[owner(key,len(inboxes))].put(('trace',key))
+        entry = next_message(results,'trace',[])[1]
+        path.append(entry)
+        key = entry[3]
+    return path
+
+#**********************************************************************
+#  Worker i: A* on the states it owns, taking children and bounds from
+#  its inbox, until told to stop.
+#
+def run_worker( i, args, inboxes, results, counters, idle ):
+    from search import load_env
+    load_env(args)
+    n = len(inboxes)
+    inbox = inboxes[i]
+    best = {}                   # key -> (g,depth,state,parent_key,action)
+    heap = []                   # (f,-g,tick,key,g)
+    outbox = [[] for j in range(n)]
+    bound = float('inf')
+    expanded = 0
+    generated = 0
+    tick = 0
+
+    def add( entry ):
+        nonlocal tick
+        (g,depth,state,parent_key,action) = entry
+        key = state.key()
+        if key in best and best[key][0] <= g:
+            return
+        best[key] = entry
+        tick += 1
+        heapq.heappush(heap,(g + state.h,-g,tick,key,g))
+
+    while True:
+        busy = heap and heap[0][0] < bound
+        message = None
+        if not busy:
+            for j in range(n):
+                if outbox[j]:
+                    send(inboxes,j,counters,outbox[j])
+                    outbox[j] = []
+            idle[i] = 1
+            message = inbox.get()
+        elif expanded % 32 == 0:
+            try:
+                message = inbox.get_nowait()
+            except queue.Empty:
+                pass
+        if not message is None:
+            if message[0] == 'nodes':
+                idle[i] = 0
+                for entry in message[1]:
+                    add(entry)
+                with counters.get_lock():
+                    counters[1] += 1
+            elif message[0] == 'bound':
+                bound = min(bound,message[1])
+            elif message[0] == 'trace':
+                results.put(('trace',best[message[1]]))
+            elif message[0] == 'stop':
+                results.put(('done',i,expanded,generated))
+                for box in inboxes:
+                    box.cancel_join_thread()
+                return
+            continue
+        (f,minus_g,t,key,g) = heapq.heappop(heap)
+        entry = best[key]
+        if entry[0] != g:
+            continue
+        (g,depth,state,parent_key,action) = entry
+        expanded += 1
+        if expanded % 10000 == 0:
+            results.put(('progress',i,expanded))
+        if state.is_goal():
+            bound = min(bound,g)
+            with counters.get_lock():
+                counters[0] += 1
+            results.put(('goal',g,key))
+            continue
+        for (child,act,cost) in state.expand():
+            generated += 1
+            if g + cost + child.h >= bound:
+                continue
+            entry = (g + cost,depth + 1,child,key,act)
+            j = owner(child.key(),n)
+            if j == i:
+                add(entry)
+            else:
+                outbox[j].append(entry)
+                if len(outbox[j]) >= args.hda_batch:
+                    send(inboxes,j,counters,outbox[j])
+                    outbox[j] = []
@@ -0,0 +1,218 @@
+#**********************************************************************
+#   instances.py
+#
+#   Random sliding tile puzzle instances in bulk, for search.py --batch
+#   and benchmark.py --instances. Boards are drawn as uniformly random
+#   permutations, in NumPy batches of --chunk, and those of the wrong
+#   parity for the goal are dropped, so that every solvable board is
+#   equally likely (the random walks of --d stay close to the goal).
+#   --h_min and --h_max keep only the boards whose Manhattan distance
+#   is in that range.
+#
+#   Output (--out, or stdout), in --format:
+#     text    one board per line in hex digits (16D75034BA8E29CF), with
+#             the goal after a tab if --goal is given
+#     binary  a 16 byte header (b'TILES\0', rows, cols, and the goal
+#             packed as below, or 0 for the standard goal) followed by
+#             one little endian uint64 per board, with the tile at cell
+#             k in bits [4k,4k+4) as in sliding.py: 8 bytes a board
+#   search.py --batch reads either, telling them apart by the header.
+#
+#   python3 instances.py --rows 4 --count 1000000 --seed 1 --format binary --out 15.bin
+#   python3 instances.py --rows 3 --count 1000 --h_min 20 --out hard8.txt
+#   python3 search.py --env sliding --s astar --h linear --closed --batch hard8.txt
+#
+import argparse
+import sys
+import time
+
+import numpy as np
+
+MAGIC = b'TILES\0'
+
+#  the boards that State.scan can read back
+SIZES = [(2,3),(3,3),(3,4),(4,4)]
+
+DIGITS = np.frombuffer(b'0123456789ABCDEF',dtype=np.uint8)
+
+class Boards:
+
+    def __init__(self,rows,cols,goal=None):
+        n = rows*cols
+        self.rows = rows
+        self.cols = cols
+        self.n = n
+        self.standard = goal is None
+        if goal is None:
+            goal = list(range(1,n)) + [0]
+        self.goal = np.array(goal,dtype=np.uint8)
+        self.goal_pos = np.argsort(self.goal)
+        self.row = np.arange(n) // cols
+        self.col = np.arange(n) % cols
+        # md[t,k] is the Manhattan distance of tile t at cell k
+        g = self.goal_pos
+        self.md = np.abs(self.row[g][:,None] - self.row[None,:]) \
+                + np.abs(self.col[g][:,None] - self.col[None,:])
+        self.md[0] = 0
+        # the pairs of cells i < j, for counting inversions
+        (self.i,self.j) = np.triu_indices(n,1)
+        self.shift = np.arange(n,dtype=np.uint64)*np.uint64(4)
+
+    def random_boards(self,m,rng):
+        a = np.tile(np.arange(self.n,dtype=np.uint8),(m,1))
+        rng.permuted(a,axis=1,out=a)
+        return a
+
+    #******************************************************************
+    #  Which boards of a can reach the goal: the parity of the
+    #  permutation taking a board to the goal (counted by inversions)
+    #  must be that of the blank's Manhattan distance to its goal cell.
+    #
+    def solvable(self,a):
+        where = self.goal_pos[a]
+        inversions = np.count_nonzero(where[:,self.i] > where[:,self.j],
+                                      axis=1)
+        k = np.argmin(a,axis=1)
+        g = self.goal_pos[0]
+        dist = np.abs(self.row[k] - self.row[g]) \
+             + np.abs(self.col[k] - self.col[g])
+        return (inversions + dist) % 2 == 0
+
+    def manhattan(self,a):
+        return self.md[a,np.arange(self.n)].sum(axis=1)
+
+    def pack(self,a):
+        return (a.astype(np.uint64) << self.shift).sum(axis=1,dtype=np.uint64)
+
+    def unpack(self,p):
+        return ((p[:,None] >> self.shift) & np.uint64(15)).astype(np.uint8)
+
+    def text(self,a):
+        lines = np.ascontiguousarray(DIGITS[a]).view('S%d' % self.n)
+        return [line.decode() for line in lines.ravel()]
+
+#**********************************************************************
+#  Yield arrays of solvable random boards (one per row), count in all,
+#  with Manhattan distance from h_min to h_max (if given).
+#
+def generate( boards, count, rng, h_min=0, h_max=None, chunk=100000 ):
+    misses = 0
+    while count > 0:
+        a = boards.random_boards(chunk,rng)
+        keep = boards.solvable(a)
+        if h_min > 0 or not h_max is None:
+            h = boards.manhattan(a)
+            keep &= h >= h_min
+            if not h_max is None:
+                keep &= h <= h_max
+        a = a[keep][:count]
+        if len(a) == 0:
+            misses += 1
+            if misses == 100:
+                print('No solvable boards with h in the range given.')
+                sys.exit(1)
+            continue
+        misses = 0
+        count -= len(a)
+        yield a
+
+def write_header( file, boards ):
+    goal = 0 if boards.standard else int(boards.pack(boards.goal[None])[0])
+    file.write(MAGIC + bytes([boards.rows,boards.cols]))
+    file.write(np.array([goal],dtype='<u8').tobytes())
+
+def write_binary( file, boards, a ):
+    file.write(boards.pack(a).astype('<u8').tobytes())
+
+def write_text( file, boards, a ):
+    suffix = b'\n' if boards.standard else \
+             b'\t' + DIGITS[boards.goal].tobytes() + b'\n'
+    lines = np.empty((len(a),boards.n + len(suffix)),dtype=np.uint8)
+    lines[:,:boards.n] = DIGITS[a]
+    lines[:,boards.n:] = np.frombuffer(suffix,dtype=np.uint8)
+    file.write(lines.tobytes())
+
+#**********************************************************************
+#  Yield (index,start,goal) for each board of a binary file, after its
+#  header; goal is None for the standard goal.
+#
+def read_binary( file, header, chunk=100000 ):
+    (rows,cols) = (header[6],header[7])
+    goal = int(np.frombuffer(header[8:16],dtype='<u8')[0])
+    boards = Boards(rows,cols)
+    if goal != 0:
+        goal = boards.text(boards.unpack(np.array([goal],dtype=np.uint64)))[0]
+    else:
+        goal = None
+    index = 0
+    while True:
+        p = np.fromfile(file,dtype='<u8',count=chunk)
+        if len(p) == 0:
+            return
+        for start in boards.text(boards.unpack(p.astype(np.uint64))):
+            yield (index,start,goal)
+            index += 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows',type=int,default=4,
+                        help='rows in sliding tile puzzle')
+    parser.add_argument('--cols',type=int,default=0,
+                        help='cols in sliding tile puzzle')
+    parser.add_argument('--count',type=int,default=1000,
+                        help='number of instances')
+    parser.add_argument('--seed',type=int,default=None,
+                        help='seed for the random boards')
+    parser.add_argument('--goal',type=str,default=None,help='goal state')
+    parser.add_argument('--h_min',type=int,default=0,
+                        help='least Manhattan distance kept')
+    parser.add_argument('--h_max',type=int,default=None,
+                        help='largest Manhattan distance kept')
+    parser.add_argument('--format',type=str,default='text',
+                        help='text or binary')
+    parser.add_argument('--out',type=str,default=None,
+                        help='output file (default stdout)')
+    parser.add_argument('--chunk',type=int,default=100000,
+                        help='boards drawn at once')
+    args = parser.parse_args()
+    cols = args.cols if args.cols > 0 else args.rows
+    if not (args.rows,cols) in SIZES:
+        print('search.py reads only 2x3, 3x3, 3x4 and 4x4 boards.')
+        sys.exit(1)
+    if not args.format in ['text','binary']:
+        print('Unknown format:',args.format)
+        sys.exit(1)
+    goal = None
+    if not args.goal is None:
+        from sliding import State
+        (goal,rows,goal_cols) = State.scan(args.goal)
+        if (rows,goal_cols) != (args.rows,cols):
+            print('The goal is not a %dx%d board.' % (args.rows,cols))
+            sys.exit(1)
+    boards = Boards(args.rows,cols,goal)
+    rng = np.random.default_rng(args.seed)
+
+    t0 = time.time()
+    file = sys.stdout.buffer if args.out is None else open(args.out,'wb')
+    if args.format == 'binary':
+        write_header(file,boards)
+        write = write_binary
+    else:
+        write = write_text
+    total = 0
+    h_sum = 0
+    for a in generate(boards,args.count,rng,args.h_min,args.h_max,args.chunk):
+        write(file,boards,a)
+        total += len(a)
+        h_sum += int(boards.manhattan(a).sum())
+    file.flush()
+    if not args.out is None:
+        file.close()
+        print('Instances:',total,end='.')
+        print(' Mean Manhattan distance: %.2f' % (h_sum/max(total,1)),end='.')
+        print(' Time: %.1fs' % (time.time()-t0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#**********************************************************************
+#   landmarks.py
+#
+#   ALT heuristic (A*, Landmarks, Triangle inequality) for the graph
+#   environments (romania, graph and file).
+#
+#   For each of k landmarks L, Dijkstra's algorithm gives the distances
+#   d(L,v) from L and d(v,L) to L of every node v. By the triangle
+#   inequality, d(v,t) >= d(L,t) - d(L,v) and d(v,t) >= d(v,L) - d(t,L),
+#   so the largest of these over all landmarks is an admissible (and
+#   consistent) estimate of the distance from v to any goal t.
+#
+#   Landmarks are chosen farthest first: each new landmark is the node
+#   farthest from those already chosen. The tables are saved in
+#   --alt_dir (alt by default) as <graph>-<k>.npz, together with a
+#   fingerprint of the graph, and rebuilt only if the graph changes.
+#
+#   python3 search.py --env romania --s astar --h alt --start dobreta --goal fagaras
+#
+import hashlib
+import heapq
+import os
+import sys
+import time
+
+import numpy as np
+
+class Landmarks:
+
+    def __init__(self,names,landmarks,dist_from,dist_to):
+        self.names = names
+        self.landmarks = landmarks
+        self.dist_from = dist_from         # dist_from[i,v] = d(L_i,v)
+        self.dist_to = dist_to             # dist_to[i,v]   = d(v,L_i)
+        self.ids = None
+
+    #******************************************************************
+    #  Load the tables for graph (named name) from alt_dir, or build
+    #  and save them if they are missing or out of date.
+    #
+    def load(graph,name,k=8,alt_dir='alt'):
+        k = min(k,graph.n)
+        path = os.path.join(alt_dir,'%s-%d.npz' % (name,k))
+        key = fingerprint(graph)
+        if os.path.exists(path):
+            data = np.load(path)
+            if str(data['fingerprint']) == key:
+                return Landmarks(graph.names,data['landmarks'],
+                                 data['dist_from'],data['dist_to'])
+        t0 = time.time()
+        alt = Landmarks.build(graph,k)
+        os.makedirs(alt_dir,exist_ok=True)
+        np.savez(path,fingerprint=key,landmarks=alt.landmarks,
+                 dist_from=alt.dist_from,dist_to=alt.dist_to)
+        print('Built %d landmarks for %s in %.1fs: %s' % (k,name,
+              time.time() - t0,path),file=sys.stderr)
+        return alt
+
+    def build(graph,k):
+        forward = (graph.indptr.tolist(),graph.indices.tolist(),
+                   graph.weights.tolist())
+        if symmetric(graph):
+            backward = None
+        else:
+            backward = (graph.rindptr.tolist(),graph.rindices.tolist(),
+                        graph.rweights.tolist())
+        dist_from = np.zeros((k,graph.n))
+        dist_to = np.zeros((k,graph.n))
+        landmarks = np.zeros(k,dtype=np.int64)
+        # farthest = distance to the nearest landmark chosen so far
+        farthest = reachable(dijkstra(forward,0,graph.n))
+        for i in range(k):
+            landmarks[i] = L = int(np.argmax(farthest))
+            dist_from[i] = dijkstra(forward,L,graph.n)
+            if backward is None:
+                dist_to[i] = dist_from[i]
+            else:
+                dist_to[i] = dijkstra(backward,L,graph.n)
+            farthest = np.minimum(farthest,reachable(dist_from[i]))
+            farthest[L] = -1
+        return Landmarks(graph.names,landmarks,dist_from,dist_to)
+
+    #******************************************************************
+    #  Lower bounds on the distance from every node to t, or from u to v.
+    #  Differences of two infinite distances are nan and ignored.
+    #
+    def bounds_to(self,t):
+        with np.errstate(invalid='ignore'):
+            fwd = self.dist_from[:,t,None] - self.dist_from
+            bwd = self.dist_to - self.dist_to[:,t,None]
+            h = np.fmax(np.fmax.reduce(fwd,axis=0),np.fmax.reduce(bwd,axis=0))
+        return np.fmax(h,0.0)
+
+    def bound(self,u,v):
+        with np.errstate(invalid='ignore'):
+            fwd = self.dist_from[:,v] - self.dist_from[:,u]
+            bwd = self.dist_to[:,u] - self.dist_to[:,v]
+            h = np.fmax(np.fmax.reduce(fwd),np.fmax.reduce(bwd))
+        return float(np.fmax(h,0.0))
+
+    #  for the environments whose states are named: name -> estimate
+    def table_to(self,goal):
+        if self.ids is None:
+            self.ids = {str(name):i for (i,name) in enumerate(self.names)}
+        if not goal in self.ids:
+            sys.exit('Unknown node: %s' % goal)
+        h = self.bounds_to(self.ids[goal])
+        return dict(zip([str(name) for name in self.names],h.tolist()))
+
+    def bound_names(self,a,b):
+        return self.bound(self.ids[a],self.ids[b])
+
+#**********************************************************************
+#   Distances from source to every node, with the edges given as CSR
+#   lists (indptr,indices,weights); inf if a node is unreachable.
+#   With parents=True, also return the parent of each node in the
+#   shortest path tree (-1 for the source and unreachable nodes).
+#
+def dijkstra( edges, source, n, parents=False ):
+    (indptr,indices,weights) = edges
+    dist = [float('inf')]*n
+    parent = [-1]*n
+    dist[source] = 0
+    heap = [(0,source)]
+    while heap:
+        (d,u) = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for i in range(indptr[u],indptr[u+1]):
+            v = indices[i]
+            dv = d + weights[i]
+            if dv < dist[v]:
+                dist[v] = dv
+                parent[v] = u
+                heapq.heappush(heap,(dv,v))
+    if parents:
+        return (np.array(dist),np.array(parent,dtype=np.int32))
+    return np.array(dist)
+
+def reachable( dist ):
+    return np.where(np.isinf(dist),-1.0,dist)
+
+#  True if every edge has a reverse edge of the same cost
+def symmetric( graph ):
+    src = np.repeat(np.arange(graph.n),np.diff(graph.indptr))
+    dst = np.repeat(np.arange(graph.n),np.diff(graph.rindptr))
+    a = np.lexsort((graph.weights,graph.indices,src))
+    b = np.lexsort((graph.rweights,graph.rindices,dst))
+    return (np.array_equal(src[a],dst[b]) and
+            np.array_equal(graph.indices[a],graph.rindices[b]) and
+            np.array_equal(graph.weights[a],graph.rweights[b]))
+
+def fingerprint( graph ):
+    h = hashlib.sha1()
+    for a in [graph.names,graph.indptr,graph.indices,graph.weights]:
+        h.update(np.ascontiguousarray(a).tobytes())
+    return h.hexdigest()
@@ -0,0 +1,242 @@
+#**********************************************************************
+#   layered_bfs.py
+#
+#   Breadth first search of the sliding tile puzzle one whole layer at
+#   a time, with each layer held as a sorted NumPy array of packed
+#   states (uint64, 4 bits per cell as in sliding.py, so up to 16 cells).
+#   The children of a layer are generated with vectorized blank moves,
+#   and duplicates are removed by sorting and by a sorted search in
+#   the previous layer. Since every move changes the parity of the
+#   blank's position, a child can only be in the previous layer or new,
+#   never in the current layer.
+#
+#   For each state only the code of the move that reached it is kept
+#   (one byte), from which the path to the start is rebuilt layer by
+#   layer. A full enumeration (no goal) keeps just the last two layers.
+#
+#   python3 search.py --env sliding --s lbfs --start 867254301
+#   python3 layered_bfs.py --rows 3 --cols 4
+#
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from limits import check_limits
+
+#  move codes, in the order of Geometry.moves: the tile at blank + step
+#  slides into the blank; the inverse of code m is 3 - m
+ACTIONS = ['down','right','left','up']
+
+class Layers:
+
+    def __init__(self,rows,cols,chunk=1<<22):
+        self.rows = rows
+        self.cols = cols
+        self.n = rows*cols
+        if self.n > 16:
+            sys.exit('Layered search needs at most 16 cells, not %d' % self.n)
+        self.chunk = chunk
+        self.steps = [cols,1,-1,-cols]
+        self.shift = [np.uint64(4*k) for k in range(self.n)]
+
+    def blanks(self,p):
+        blank = np.zeros(len(p),dtype=np.int8)
+        for k in range(1,self.n):
+            blank[((p >> self.shift[k]) & np.uint64(15)) == 0] = k
+        return blank
+
+    def valid(self,blank,m):
+        cols = self.cols
+        if m == 0:
+            return blank < self.n - cols
+        elif m == 1:
+            return blank % cols < cols - 1
+        elif m == 2:
+            return blank % cols > 0
+        else:
+            return blank >= cols
+
+    #******************************************************************
+    #  Apply move m to every state in p whose blank is at k (and for
+    #  which m is valid): the tile at j = k + step slides to k.
+    #
+    def move(self,p,blank,m):
+        ok = self.valid(blank,m)
+        p = p[ok]
+        k = blank[ok].astype(np.uint64)*np.uint64(4)
+        j = k + np.uint64(4*self.steps[m]) if self.steps[m] > 0 else \
+            k - np.uint64(-4*self.steps[m])
+        t = (p >> j) & np.uint64(15)
+        return p ^ (t << j) ^ (t << k)
+
+    #******************************************************************
+    #  The sorted new states one move away from layer and, if codes is
+    #  True, the code of a move reaching each one (otherwise None).
+    #  Children in prev are dropped.
+    #
+    def next_layer(self,layer,prev,codes=True):
+        states = []
+        moves = []
+        generated = 0
+        for c0 in range(0,len(layer),self.chunk):
+            p = layer[c0:c0+self.chunk]
+            blank = self.blanks(p)
+            child = [self.move(p,blank,m) for m in range(4)]
+            code = None
+            if codes:
+                code = np.concatenate([np.full(len(child[m]),m,dtype=np.uint8)
+                                       for m in range(4)])
+            child = np.concatenate(child)
+            generated += len(child)
+            (child,code) = unique(child,code)
+            new = ~contains(prev,child)
+            states.append(child[new])
+            if codes:
+                moves.append(code[new])
+        if len(states) == 1:
+            return (states[0],moves[0] if codes else None,generated)
+        (s,c) = unique(np.concatenate(states),
+                       np.concatenate(moves) if codes else None)
+        return (s,c,generated)
+
+    #  the parents of states reached by moves codes (apply the inverse)
+    def parents(self,p,codes):
+        parent = p.copy()
+        blank = self.blanks(p)
+        for m in range(4):
+            sel = codes == m
+            parent[sel] = self.move(p[sel],blank[sel],3 - m)
+        return parent
+
+#  The sorted distinct values of p, with the code of one occurrence of
+#  each if codes is given. (Sorting is much faster than np.unique,
+#  which hashes, on large uint64 arrays.)
+def unique( p, codes=None ):
+    if codes is None:
+        p = np.sort(p)
+    else:
+        order = np.argsort(p)
+        p = p[order]
+        codes = codes[order]
+    first = np.empty(len(p),dtype=bool)
+    first[:1] = True
+    np.not_equal(p[1:],p[:-1],out=first[1:])
+    if codes is None:
+        return (p[first],None)
+    return (p[first],codes[first])
+
+#  True where the values in v are in the sorted array a
+def contains( a, v ):
+    if len(a) == 0:
+        return np.zeros(len(v),dtype=bool)
+    i = np.searchsorted(a,v)
+    i[i == len(a)] = 0
+    return a[i] == v
+
+#**********************************************************************
+#  Search from start (a sliding Node) for its goal, keeping every layer.
+#  Return the goal node and the number of states expanded.
+#
+def layered_search( start, args ):
+    geo = start.state.geo
+    L = Layers(geo.rows,geo.cols)
+    goal = np.uint64(geo.goal_p)
+    layer = np.array([start.state.p],dtype=np.uint64)
+    layers = [(layer,np.zeros(1,dtype=np.uint8))]
+    prev = np.zeros(0,dtype=np.uint64)
+    num_expand = 0
+    generated = 0
+    while len(layer) > 0 and not contains(layer,np.array([goal]))[0]:
+        num_expand += len(layer)
+        check_limits(num_expand,args)
+        (new,codes,count) = L.next_layer(layer,prev)
+        generated += count
+        if not args.quiet:
+            print('depth:',len(layers),end='.',file=args.out)
+            print(' States:',len(new),file=args.out)
+        (prev,layer) = (layer,new)
+        layers.append((layer,codes))
+    if len(layer) == 0:
+        start.counters.tick = generated
+        return (None,num_expand)
+    # walk back from the goal, collecting move codes
+    moves = []
+    p = np.array([goal],dtype=np.uint64)
+    for (layer,codes) in reversed(layers[1:]):
+        code = codes[np.searchsorted(layer,p)]
+        moves.append(int(code[0]))
+        p = L.parents(p,code)
+    moves.reverse()
+    node = follow(start,moves,args)
+    start.counters.tick = generated
+    return (node,num_expand)
+
+#  the goal node reached from start by the move codes in moves. The
+#  layers are found without move pruning, so it is turned off here.
+def follow( start, moves, args ):
+    from node_heap import Node
+    State = type(start.state)
+    pruning = State.pruning
+    State.pruning = None
+    try:
+        node = start
+        for (i,m) in enumerate(moves):
+            step = [(state,act,cost) for (state,act,cost)
+                    in node.state.expand() if act == ACTIONS[m]]
+            if not step:
+                raise RuntimeError('move %d (%s) of the path does not apply'
+                                   % (i+1,ACTIONS[m]))
+            (state,act,cost) = step[0]
+            node = Node(state,node,act,node.depth+1,node.g+cost,
+                        args.s,args.w)
+    finally:
+        State.pruning = pruning
+    if not node.state.is_goal():
+        raise RuntimeError('the path does not reach the goal')
+    return node
+
+#**********************************************************************
+#  Enumerate all states reachable from the goal, layer by layer,
+#  keeping only the last two layers.
+#
+def enumerate_layers( rows, cols, chunk ):
+    L = Layers(rows,cols,chunk)
+    goal = list(range(1,rows*cols)) + [0]
+    p = 0
+    for k in range(rows*cols):
+        p |= goal[k] << (4*k)
+    layer = np.array([p],dtype=np.uint64)
+    prev = np.zeros(0,dtype=np.uint64)
+    total = 0
+    peak = 0
+    depth = 0
+    t0 = time.time()
+    while len(layer) > 0:
+        print('depth %3d: %12d  (%.1fs)' % (depth,len(layer),time.time()-t0))
+        total += len(layer)
+        peak = max(peak,len(layer))
+        (layer,prev) = (L.next_layer(layer,prev,False)[0],layer)
+        depth += 1
+    print('Total:',total,end='.')
+    print(' Largest layer:',peak,end='.')
+    print(' Radius:',depth-1,end='.')
+    print(' Time: %.1fs' % (time.time()-t0))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows',type=int,default=3,
+                        help='rows in sliding tile puzzle')
+    parser.add_argument('--cols',type=int,default=0,
+                        help='cols in sliding tile puzzle')
+    parser.add_argument('--chunk',type=int,default=1<<22,
+                        help='states expanded at once')
+    args = parser.parse_args()
+    cols = args.cols if args.cols > 0 else args.rows
+    enumerate_layers(args.rows,cols,args.chunk)
+
+
+if __name__ == '__main__':
+    main()
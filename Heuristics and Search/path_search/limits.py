@@ -0,0 +1,33 @@
+#**********************************************************************
+#   limits.py
+#
+#   Per-search limits on time (--time_limit) and node expansions
+#   (--max_expand), shared by the strategies in search.py and the
+#   modules it uses. Every strategy calls check_limits with its total
+#   number of nodes expanded as it expands them, which is also where
+#   that total is given to --stats.
+#
+import time
+
+#**********************************************************************
+#  Raised when a search exceeds --time_limit or --max_expand.
+#
+class LimitReached(Exception):
+    pass
+
+#**********************************************************************
+#  Set args.deadline from args.time_limit, at the start of a search.
+#
+def start_clock( args ):
+    if args.time_limit is None:
+        args.deadline = None
+    else:
+        args.deadline = time.perf_counter() + args.time_limit
+
+def check_limits( num_expand, args ):
+    if not args.search_stats is None:
+        args.search_stats.expanded = num_expand
+    if not args.max_expand is None and num_expand > args.max_expand:
+        raise LimitReached('expanded more than %d nodes' % args.max_expand)
+    if not args.deadline is None and time.perf_counter() > args.deadline:
+        raise LimitReached('time limit of %gs exceeded' % args.time_limit)
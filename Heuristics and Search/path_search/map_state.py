@@ -0,0 +1,107 @@
+#**********************************************************************
+#   map_state.py
+#
+#   The states of the small fixed maps (romania.py, graph.py), which are
+#   the names of nodes of a graph given as an adjacency dict. Each map
+#   subclasses MapState, giving as class attributes:
+#
+#   adjacent          {name:[(neighbour,cost),...]}
+#   reverse_adjacent  the same with the edges reversed (reverse_adjacency)
+#   fixed_table       {name:h}, the heuristic for default_goal
+#   map_name          the name its --h alt landmarks are saved under
+#   default_start, default_goal
+#
+#   and its own goal, table (the heuristic for goal) and landmarks, which
+#   set_goal and set_heuristic change.
+#
+import sys
+
+#  {name:[(neighbour,cost),...]} of the edges into each node
+def reverse_adjacency( adjacent ):
+    reverse = {}
+    for (a,edges) in adjacent.items():
+        for (b,cost) in edges:
+            reverse.setdefault(b,[]).append((a,cost))
+    return reverse
+
+class MapState:
+
+    def __init__(self,a=None):
+        if a is None:
+            a = self.default_start
+        self.a = a
+        self.h = self.table[a]
+
+    @classmethod
+    def start_state(cls,args):
+        if args.start is None:
+            return cls(cls.default_start)
+        else:
+            return cls(args.start)
+
+    @classmethod
+    def set_goal(cls,goal):
+        if goal is None:
+            cls.goal = cls.default_goal
+        else:
+            cls.goal = goal
+        if not cls.landmarks is None:
+            cls.table = cls.landmarks.table_to(cls.goal)
+
+    #  table (default): the fixed table, for the default goal
+    #  alt: landmark bounds (landmarks.py), admissible for any goal
+    @classmethod
+    def set_heuristic(cls,name,args):
+        if name == 'table':
+            cls.landmarks = None
+            cls.table = cls.fixed_table
+        elif name == 'alt':
+            from file_graph import Graph
+            from landmarks import Landmarks
+            cls.landmarks = Landmarks.load(Graph.from_adjacency(cls.adjacent),
+                                           cls.map_name,args.landmarks,
+                                           args.alt_dir)
+            cls.table = cls.landmarks.table_to(cls.goal)
+        else:
+            sys.exit('Unknown heuristic: %s' % name)
+
+    def is_equal_to(self,other):
+        return(self.a == other.a)
+
+    def key(self):
+        return self.a
+
+    def expand( self ):
+        children = []
+        for (state,cost) in self.adjacent[self.a]:
+            children.append((type(self)(state),'-',cost))
+        return children
+
+    def reverse_expand( self ):
+        children = []
+        for (state,cost) in self.reverse_adjacent.get(self.a,[]):
+            children.append((type(self)(state),'-',cost))
+        return children
+
+    def target_state( self ):
+        return type(self)(self.goal)
+
+    def h_to( self, other ):
+        if self.landmarks is None:
+            return 0
+        return self.landmarks.bound_names(self.a,other.a)
+
+    def is_goal( self ):
+        return self.a == self.goal
+
+    def heuristic( self ):
+        return self.table[self.a]
+
+    def print_action(self,action,file=None):
+        print('->',end='',file=file)
+
+    def print_state(self,file=None):
+        print(self.a,end='',file=file)
+
+    def __str__(self):
+        return self.a
@@ -0,0 +1,273 @@
+#**********************************************************************
+#   memory_bounded.py
+#
+#   Memory bounded optimal search strategies for search.py, which give
+#   the same solutions as astar (with an admissible heuristic) but keep
+#   only a bounded number of nodes, at the price of expanding some of
+#   them again:
+#
+#   rbfs     Recursive best first search (Korf). Only the current path
+#            and the children of the nodes on it are kept. When the
+#            best child's f exceeds the f of the best alternative
+#            elsewhere, its subtree is forgotten and its f is backed
+#            up to the smallest f found below it.
+#   smastar  Simplified memory bounded A* (Russell). Best first search
+#            over a tree of at most --max_nodes nodes, adding one
+#            successor at a time. When the tree is full, the leaf with
+#            the largest f (shallowest first) is forgotten, and its
+#            parent remembers the smallest f of its forgotten children,
+#            regenerating them once that is the smallest f left, with
+#            at least that f. Nodes that cannot be extended within the
+#            budget get f = inf, so if the budget is too small for an
+#            optimal path, the best solution that fits is found (or
+#            none).
+#
+#   Both search the tree of paths, pruning states already on the path.
+#   A node is counted as regenerated when it is generated again by the
+#   expansion of a node whose subtree was forgotten (for rbfs, one
+#   whose f has been backed up above g+h).
+#
+#   python3 search.py --env sliding --s rbfs --start 867254301 --h linear
+#   python3 search.py --env sliding --s smastar --start 867254301 --max_nodes 5000
+#
+import heapq
+import random
+
+from node_heap import Node
+from limits import LimitReached, check_limits
+from stats import heap_ops
+
+INF = float('inf')
+
+class MemoryNode(Node):
+
+    __slots__ = ('children','forgot','queued','pending','floor','regen')
+
+    def __init__(self, state, parent=None, action=None,
+                 depth=0, g=0, strategy='smastar', weight=1, counters=None ):
+        Node.__init__(self,state,parent,action,depth,g,strategy,weight,
+                      counters)
+        self.children = []         # children held
+        self.forgot = INF          # smallest f of forgotten children
+        self.queued = 0            # stamp of the node's heap entries
+        self.pending = None        # successors still to generate, or
+                                   # None until expanded
+        self.floor = 0             # least f of the successors pending
+        self.regen = False         # pending are regenerated
+
+#**********************************************************************
+#  Search from start with args.s (rbfs or smastar). Return the goal
+#  node (or None), the number of nodes expanded, and the counts of
+#  forgotten, regenerated and peak nodes held.
+#
+def memory_bounded_search( start, args ):
+    if args.s == 'rbfs':
+        return recursive_best_first(start,args)
+    else:
+        return sma_star(start,args)
+
+#**********************************************************************
+#  Successors (state,action,cost) of node, skipping states on the path
+#  to node (and those whose keys are in skip).
+#
+def successors_of( node, args, skip=() ):
+    if args.search_stats is None:
+        children = node.state.expand()
+    else:
+        children = args.search_stats.expand(node.state)
+    if args.shuffle:
+        random.shuffle(children)
+    successors = []
+    for (state,act,cost) in children:
+        if state.key() in skip:
+            continue
+        ancestor = node
+        while not (ancestor is None or ancestor.state.is_equal_to(state)):
+            ancestor = ancestor.parent
+        if ancestor is None:
+            successors.append((state,act,cost))
+        elif not args.search_stats is None:
+            args.search_stats.pruned += 1
+    return successors
+
+def children_of( node, args ):
+    return [Node(state,node,act,node.depth+1,node.g+cost,args.s,args.w)
+            for (state,act,cost) in successors_of(node,args)]
+
+def counts( forgotten, regenerated, peak ):
+    return {'Forgotten':forgotten,'Regenerated':regenerated,
+            'Peak nodes':peak}
+
+#**********************************************************************
+#  RBFS, with an explicit stack of (node, children, f limit) frames in
+#  place of recursion, so that long paths do not reach Python's limit.
+#
+def recursive_best_first( start, args ):
+    num_expand = 0
+    forgotten = 0
+    regenerated = 0
+    held = 1
+    peak = 1
+    stack = []
+    node = start
+    limit = INF
+    while True:
+        num_expand += 1
+        check_limits(num_expand,args)
+        if args.v:
+            node.print_node_ghf(args,args.unique)
+        if node.state.is_goal():
+            return (node,num_expand,counts(forgotten,regenerated,peak))
+        children = children_of(node,args)
+        if node.cost > node.g + node.state.h:     # expanded before
+            regenerated += len(children)
+            for child in children:
+                child.cost = max(child.cost,node.cost)
+        held += len(children)
+        peak = max(peak,held)
+        if not args.search_stats is None:
+            args.search_stats.resize(len(children))
+        stack.append((node,children,limit))
+        # back up out of the subtrees whose best f exceeds their limit
+        while True:
+            (node,children,limit) = stack[-1]
+            children.sort(key=lambda child: child.cost)
+            best = children[0].cost if children else INF
+            if best <= limit:
+                break
+            stack.pop()
+            forgotten += len(children)
+            held -= len(children)
+            if not args.search_stats is None:
+                args.search_stats.resize(-len(children))
+            node.cost = best
+            if not stack:
+                return (None,num_expand,counts(forgotten,regenerated,peak))
+        if len(children) > 1:
+            limit = min(limit,children[1].cost)
+        node = children[0]
+
+#**********************************************************************
+#  SMA*, generating one successor at a time. The queue holds the nodes
+#  with successors not held: unexpanded leaves by f, nodes part way
+#  through their successors by the least f left for them, and nodes
+#  with forgotten children by the smallest f forgotten (deepest first).
+#  A second heap orders the leaves for forgetting. When the tree is
+#  full, a leaf is forgotten before the next successor is added, so
+#  that at most --max_nodes nodes are held. If no solution is found
+#  after a path was cut short for lack of room, LimitReached is raised,
+#  since a solution may need more nodes than --max_nodes.
+#
+def sma_star( start, args ):
+    budget = max(args.max_nodes,2)
+    start = MemoryNode(start.state,None,None,0,0,args.s,args.w,start.counters)
+    queue = []
+    leaves = []
+    stamp = [0]
+    (heappush,heappop) = heap_ops(args)
+
+    # new heap entries for node, whose f or children have changed
+    def push( node ):
+        stamp[0] += 1
+        node.queued = stamp[0]
+        if node.pending is None:
+            key = node.cost
+        elif node.pending:
+            key = node.floor
+        else:
+            key = node.forgot
+        if key < INF:
+            heappush(queue,(key,-node.depth,stamp[0],node))
+        if not node.children and not node.parent is None:
+            heappush(leaves,(-node.cost,node.depth,stamp[0],node))
+
+    push(start)
+    held = 1
+    peak = 1
+    num_expand = 0
+    forgotten = 0
+    regenerated = 0
+    cut = False                           # a path ran out of room
+    while queue:
+        (f,depth,s,node) = heappop(queue)
+        if s != node.queued:
+            continue
+        if f == INF:
+            break
+        if not node.pending:               # expanded, not continued
+            num_expand += 1
+            if args.v:
+                node.print_node_ghf(args,args.unique)
+        check_limits(num_expand,args)
+        if node.pending is None:
+            if node.state.is_goal():
+                return (node,num_expand,counts(forgotten,regenerated,peak))
+            node.pending = successors_of(node,args)[::-1]
+            node.floor = node.cost
+            node.regen = False
+        elif not node.pending:
+            present = {child.state.key() for child in node.children}
+            node.pending = successors_of(node,args,present)[::-1]
+            node.floor = node.forgot
+            node.forgot = INF
+            node.regen = True
+        if node.pending:
+            (state,act,cost) = node.pending.pop()
+            child = MemoryNode(state,node,act,node.depth+1,node.g+cost,
+                               args.s,args.w)
+            child.cost = max(child.cost,node.floor)
+            if child.depth >= budget - 1 and not child.state.is_goal():
+                child.cost = INF          # no room to extend its path
+                cut = True
+            regenerated += node.regen
+            # forget the worst leaves (but not node) to make room
+            kept = []
+            while held >= budget:
+                entry = heappop(leaves)
+                (f,depth,s,leaf) = entry
+                if s != leaf.queued:
+                    continue
+                if leaf is node:
+                    kept.append(entry)
+                    continue
+                leaf.queued = 0
+                parent = leaf.parent
+                parent.children.remove(leaf)
+                parent.forgot = min(parent.forgot,leaf.cost)
+                held -= 1
+                forgotten += 1
+                if not parent is node:
+                    push(parent)
+            for entry in kept:
+                heappush(leaves,entry)
+            node.children.append(child)
+            held += 1
+            peak = max(peak,held)
+            push(child)
+        if not node.pending:
+            backup(node)
+        push(node)
+        # stale entries keep forgotten nodes alive; drop them now and then
+        if len(queue) + len(leaves) > 4*held + 1000:
+            entries = len(queue) + len(leaves)
+            queue[:] = [e for e in queue if e[2] == e[3].queued]
+            leaves[:] = [e for e in leaves if e[2] == e[3].queued]
+            heapq.heapify(queue)
+            heapq.heapify(leaves)
+            if not args.search_stats is None:
+                args.search_stats.resize(len(queue) + len(leaves) - entries)
+    if cut:
+        raise LimitReached('no solution within --max_nodes %d nodes' % budget)
+    return (None,num_expand,counts(forgotten,regenerated,peak))
+
+#  Once all the successors of node have been generated, back the
+#  smallest f of its children (and forgotten children) up from node
+#  towards the root, as far as it changes. The f of a child is never
+#  below that of its parent, so f only rises.
+def backup( node ):
+    while not node is None and node.pending == []:
+        f = min([child.cost for child in node.children] + [node.forgot])
+        if f == node.cost:
+            break
+        node.cost = f
+        node = node.parent
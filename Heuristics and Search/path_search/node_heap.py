@@ -6,69 +6,96 @@
 #   This code provides the Node and Heap classes which are used
 #   by the path search algorithms implemented in search.py
 #
+import collections
+import heapq
+import sys
+
+#**********************************************************************
+#   The counters of one search: tick, the number of nodes generated
+#   (which also numbers each node), and printed, the keys of the states
+#   printed by --unique. A search keeps its own in args.counters, and
+#   each node shares that of its parent.
+#
+class Counters:
+
+    def __init__(self):
+        self.tick = 0
+        self.printed = set()
+
 
 class Node:
 
-    tick = 0
-    printed = []
+    __slots__ = ('state','parent','action','depth','g','cost','num',
+                 'counters')
 
     def __init__(self, state, parent=None, action=None,
-                 depth=0, g=0, strategy='bfs', weight=1 ):
+                 depth=0, g=0, strategy='bfs', weight=1, counters=None ):
         self.state  = state
         self.parent = parent
         self.action = action
         self.depth  = depth
         self.g      = g
         self.cost   = self.get_cost(strategy,weight)
-        self.num    = Node.tick
-        Node.tick += 1
+        if not parent is None:
+            counters = parent.counters
+        elif counters is None:
+            counters = Counters()
+        self.counters = counters
+        self.num    = counters.tick
+        counters.tick += 1
 
     def get_cost( self, strategy, weight ):
-        if strategy == 'bfs' or strategy == 'bfs1' or strategy == 'dfs':
+        if strategy == 'bfs' or strategy == 'bfs1' or strategy == 'dfs' \
+                           or strategy == 'bibfs' or strategy == 'lbfs' \
+                           or strategy == 'ebfs':
             return  self.depth
-        elif strategy == 'ucs':
+        elif strategy == 'ucs' or strategy == 'biucs':
             return  self.g
         elif strategy == 'greedy':
             return  self.state.h
-        elif strategy == 'astar':
+        elif strategy == 'astar' or strategy == 'biastar' \
+                                 or strategy == 'rbfs' or strategy == 'smastar' \
+                                 or strategy == 'arastar' or strategy == 'hdastar' \
+                                 or strategy == 'lrtastar' or strategy == 'rtaastar':
             return self.g + self.state.h
         elif strategy == 'heuristic':
             return (2-weight)*self.g + weight*self.state.h
         else:
-            print('Unknown Strategy: ',strategy)
-            exit( 1 )
+            sys.exit('Unknown Strategy: %s' % strategy)
 
-    def print_state(self):
+    def print_state(self,file=None):
         for k in range(self.depth):
-            print('.',end='')
-        print(' ',end='')
-        self.state.print_state()
+            print('.',end='',file=file)
+        print(' ',end='',file=file)
+        self.state.print_state(file)
 
-    def print_path(self):
+    def print_path(self,file=None):
         if self.parent is None:
-            self.state.print_state()
+            self.state.print_state(file)
         else:
-            self.parent.print_path()
-            self.state.print_action(self.action)
-            self.state.print_state()
+            self.parent.print_path(file)
+            self.state.print_action(self.action,file)
+            self.state.print_state(file)
 
     def print_node_ghf(self,args,unique=False):
         if unique:
-            for state in Node.printed:
-                if self.state.is_equal_to(state):
-                    return
-            Node.printed.append(self.state)
-        self.print_state()
-        if args.s == 'ucs' or args.s == 'astar' or args.s == 'heuristic':
-            print(' (g:',end='')
-            print(self.g,end='')
-            if args.s == 'astar' or args.s == 'heuristic':
-                print(', h:',end='')
-                print(self.state.h,end='')
-                print(', f:',end='')
-                print(self.cost,end='')
-            print(')',end='')
-        print()
+            key = self.state.key()
+            if key in self.counters.printed:
+                return
+            self.counters.printed.add(key)
+        out = args.out
+        self.print_state(out)
+        if args.s in ['ucs','astar','heuristic','rbfs','smastar','arastar',
+                      'hdastar','lrtastar','rtaastar']:
+            print(' (g:',end='',file=out)
+            print(self.g,end='',file=out)
+            if args.s != 'ucs':
+                print(', h:',end='',file=out)
+                print(self.state.h,end='',file=out)
+                print(', f:',end='',file=out)
+                print(self.cost,end='',file=out)
+            print(')',end='',file=out)
+        print(file=out)
 
     
 #**********************************************************************
@@ -131,3 +158,145 @@ class MyHeap:
         self.sift_down(1)
         return root
 
+
+
+#**********************************************************************
+#   Priority Queue built on heapq, holding (cost, tiebreak, num, node, key)
+#   entries so that comparisons are done on plain numbers in C.
+#   As in MyHeap, when two nodes rank equally, priority is given to the
+#   one generated earlier (tie='fifo'), or else to the one generated
+#   later ('lifo'), or to the one with higher g, then the later one
+#   ('high_g'), as in BucketQueue. If a key is given to insert(), any entry
+#   already queued under that key is invalidated (lazy deletion), which
+#   provides decrease-key without a linear scan: an entry is stale if
+#   it is no longer the one recorded for its key, and is skipped.
+#
+class LazyHeap:
+    def __init__(self,strategy='bfs',weight=1,tie='fifo'):
+        self.a = []
+        self.entry = {}
+        self.size = 0
+        self.strategy = strategy
+        self.weight = weight
+        self.tie = check_tie(tie)
+
+    def insert(self,n,key=None):
+        if self.tie == 'fifo':
+            entry = (n.cost,0,n.num,n,key)
+        elif self.tie == 'lifo':
+            entry = (n.cost,0,-n.num,n,key)
+        else:
+            entry = (n.cost,-n.g,-n.num,n,key)
+        if not key is None:
+            if key in self.entry:
+                self.size -= 1
+            self.entry[key] = entry
+        heapq.heappush(self.a,entry)
+        self.size += 1
+
+    def stale(self,entry):
+        key = entry[4]
+        return not (key is None or self.entry.get(key) is entry)
+
+    def remove_min(self):
+        while self.a:
+            entry = heapq.heappop(self.a)
+            if not self.stale(entry):
+                if not entry[4] is None:
+                    del self.entry[entry[4]]
+                self.size -= 1
+                return entry[3]
+        return None
+
+    def min_cost(self):
+        while self.a and self.stale(self.a[0]):
+            heapq.heappop(self.a)
+        if self.a:
+            return self.a[0][0]
+        else:
+            return None
+
+#**********************************************************************
+#   Priority Queue of buckets, one for each integer cost, for searches
+#   whose costs are all integers (breadth first, or ucs and astar on
+#   the sliding tile puzzle). insert() and remove_min() take O(1) time,
+#   apart from stepping over empty buckets. Within a bucket, nodes are
+#   taken first in first out (tie='fifo', the same order as MyHeap),
+#   last in first out ('lifo'), or highest g first and then last in
+#   first out ('high_g'), which for astar reaches the goal early among
+#   the nodes with the optimal f. Keys give lazy deletion, as in LazyHeap.
+#
+class BucketQueue:
+    def __init__(self,strategy='bfs',weight=1,tie='fifo'):
+        self.buckets = []
+        self.min = 0               # no live entry has a lower cost
+        self.entry = {}
+        self.size = 0
+        self.strategy = strategy
+        self.weight = weight
+        self.tie = check_tie(tie)
+
+    def new_bucket(self):
+        if self.tie == 'fifo':
+            return collections.deque()
+        else:
+            return []
+
+    def insert(self,n,key=None):
+        f = int(n.cost)
+        if f != n.cost or f < 0:
+            sys.exit('BucketQueue needs costs that are integers, not %s'
+                     % n.cost)
+        buckets = self.buckets
+        while len(buckets) <= f:
+            buckets.append(self.new_bucket())
+        if self.tie == 'high_g':         # a list for each g
+            bucket = buckets[f]
+            g = int(n.g)
+            while len(bucket) <= g:
+                bucket.append([])
+            bucket[g].append((n,key))
+        else:
+            buckets[f].append((n,key))
+        if f < self.min:
+            self.min = f
+        if not key is None:
+            if key in self.entry:
+                self.size -= 1
+            self.entry[key] = n
+        self.size += 1
+
+    def stale(self,n,key):
+        return not (key is None or self.entry.get(key) is n)
+
+    #  the next entry of bucket, or None if it is empty
+    def take(self,bucket):
+        if self.tie == 'fifo':
+            return bucket.popleft() if bucket else None
+        elif self.tie == 'lifo':
+            return bucket.pop() if bucket else None
+        while bucket and not bucket[-1]:
+            bucket.pop()
+        return bucket[-1].pop() if bucket else None
+
+    def remove_min(self):
+        buckets = self.buckets
+        while self.size > 0 and self.min < len(buckets):
+            entry = self.take(buckets[self.min])
+            if entry is None:
+                self.min += 1
+                continue
+            (n,key) = entry
+            if not self.stale(n,key):
+                if not key is None:
+                    del self.entry[key]
+                self.size -= 1
+                return n
+        return None
+
+TIES = ['fifo','lifo','high_g']
+
+def check_tie( tie ):
+    if not tie in TIES:
+        sys.exit('Unknown tie-break: %s' % tie)
+    return tie
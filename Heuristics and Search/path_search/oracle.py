@@ -0,0 +1,407 @@
+#**********************************************************************
+#   oracle.py
+#
+#   Distance oracle for repeated shortest path queries on a static graph
+#   (romania, graph, or a file graph loaded with --env file). An index
+#   is built once, saved in --oracle_dir (oracle by default), and then
+#   answers cost and path queries without searching the whole graph:
+#
+#   table  all pairs shortest path table (n Dijkstra searches), with the
+#          parent of each node in every shortest path tree. A query is a
+#          table lookup. Used when the graph has at most --table_max nodes.
+#   ch     contraction hierarchy. Nodes are contracted in order of edge
+#          difference, adding shortcut edges where no witness path
+#          avoids the contracted node. A query is a bidirectional
+#          Dijkstra search that only climbs to higher ranked nodes;
+#          shortcuts on the path found are then unpacked.
+#
+#   python3 oracle.py --env romania --start arad --goal bucharest
+#   python3 oracle.py --env file --graph map.gr --queries pairs.txt
+#   python3 oracle.py --env romania --verify 100
+#
+#   --queries prints one JSON line per start goal line of the file (as
+#   for search.py --batch). --verify compares the oracle with search.py
+#   --s ucs --closed on random pairs of nodes.
+#
+import heapq
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from landmarks import dijkstra, fingerprint
+
+INF = float('inf')
+
+#**********************************************************************
+#   Load the index for graph (named name) from oracle_dir, or build and
+#   save it. method is table, ch or auto (table if small enough).
+#
+def load_oracle( graph, name, method='auto', table_max=2048,
+                 oracle_dir='oracle' ):
+    if method == 'auto':
+        method = 'table' if graph.n <= table_max else 'ch'
+    if method == 'table':
+        kind = TableOracle
+    elif method == 'ch':
+        kind = CHOracle
+    else:
+        print('Unknown oracle method:',method)
+        sys.exit(1)
+    path = os.path.join(oracle_dir,'%s-%s.npz' % (name,method))
+    key = fingerprint(graph)
+    if os.path.exists(path):
+        data = np.load(path)
+        if str(data['fingerprint']) == key:
+            return kind(graph.names,{k:data[k] for k in data.files})
+    t0 = time.time()
+    oracle = kind.build(graph)
+    os.makedirs(oracle_dir,exist_ok=True)
+    np.savez(path,fingerprint=key,**oracle.arrays)
+    print('Built %s oracle for %s in %.1fs: %s' % (method,name,
+          time.time() - t0,path),file=sys.stderr)
+    return oracle
+
+
+class TableOracle:
+
+    def __init__(self,names,arrays):
+        self.names = names
+        self.arrays = arrays
+        self.dist = arrays['dist']         # dist[s,t]
+        self.parent = arrays['parent']     # parent[s,t]: before t, from s
+
+    def build(graph):
+        edges = (graph.indptr.tolist(),graph.indices.tolist(),
+                 graph.weights.tolist())
+        dist = np.zeros((graph.n,graph.n))
+        parent = np.zeros((graph.n,graph.n),dtype=np.int32)
+        for s in range(graph.n):
+            (dist[s],parent[s]) = dijkstra(edges,s,graph.n,parents=True)
+        return TableOracle(graph.names,{'dist':dist,'parent':parent})
+
+    def query(self,s,t):
+        cost = float(self.dist[s,t])
+        if cost == INF:
+            return (INF,None)
+        path = [t]
+        parent = self.parent[s]
+        while path[-1] != s:
+            path.append(int(parent[path[-1]]))
+        path.reverse()
+        return (cost,path)
+
+
+class CHOracle:
+
+    def __init__(self,names,arrays):
+        self.names = names
+        self.arrays = arrays
+        self.rank = arrays['rank']
+        # up[0]: edges v->w to higher ranked w; up[1]: edges w->v from
+        # higher ranked w, stored at v; mid is the contracted node of a
+        # shortcut, or -1 for an edge of the graph
+        self.up = []
+        for d in ['up','down']:
+            self.up.append((arrays[d+'_ptr'].tolist(),
+                            arrays[d+'_to'].tolist(),
+                            arrays[d+'_cost'].tolist(),
+                            arrays[d+'_mid'].tolist()))
+
+    #******************************************************************
+    #  Contract every node, lowest priority (edge difference plus
+    #  contracted neighbours) first, recomputing priorities lazily.
+    #
+    def build(graph,settle_max=500):
+        n = graph.n
+        out = [dict() for v in range(n)]
+        inn = [dict() for v in range(n)]
+        (indptr,indices,weights) = (graph.indptr.tolist(),
+                                    graph.indices.tolist(),
+                                    graph.weights.tolist())
+        for u in range(n):
+            for i in range(indptr[u],indptr[u+1]):
+                v = indices[i]
+                if v != u and weights[i] < out[u].get(v,INF):
+                    out[u][v] = weights[i]
+                    inn[v][u] = weights[i]
+        mid = {}
+        rank = np.zeros(n,dtype=np.int64)
+        up = [None]*n
+        down = [None]*n
+        contracted = [0]*n
+        heap = []
+        for v in range(n):
+            found = shortcuts(v,out,inn,settle_max)
+            heap.append((len(found) - len(inn[v]) - len(out[v]),v))
+        heapq.heapify(heap)
+        order = 0
+        while heap:
+            (p,v) = heapq.heappop(heap)
+            found = shortcuts(v,out,inn,settle_max)
+            p = len(found) - len(inn[v]) - len(out[v]) + contracted[v]
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap,(p,v))
+                continue
+            rank[v] = order
+            order += 1
+            for (u,w,c) in found:
+                if c < out[u].get(w,INF):
+                    out[u][w] = c
+                    inn[w][u] = c
+                    mid[(u,w)] = v
+            # the remaining neighbours of v are all ranked higher
+            up[v] = [(w,c,mid.get((v,w),-1)) for (w,c) in out[v].items()]
+            down[v] = [(u,c,mid.get((u,v),-1)) for (u,c) in inn[v].items()]
+            for u in inn[v]:
+                del out[u][v]
+                contracted[u] += 1
+            for w in out[v]:
+                del inn[w][v]
+                contracted[w] += 1
+            out[v] = None
+            inn[v] = None
+        arrays = {'rank':rank}
+        for (d,rows) in [('up',up),('down',down)]:
+            arrays[d+'_ptr'] = np.cumsum([0]+[len(row) for row in rows])
+            edges = [edge for row in rows for edge in row]
+            arrays[d+'_to'] = np.array([e[0] for e in edges],dtype=np.int64)
+            arrays[d+'_cost'] = np.array([e[1] for e in edges],
+                                         dtype=graph.weights.dtype)
+            arrays[d+'_mid'] = np.array([e[2] for e in edges],dtype=np.int64)
+        return CHOracle(graph.names,arrays)
+
+    #******************************************************************
+    #  Bidirectional Dijkstra search upwards from s and (backwards)
+    #  from t. Each direction stops once its minimum reaches the cost
+    #  of the best meeting point found.
+    #
+    def query(self,s,t):
+        dist = [{s:0},{t:0}]
+        parent = [{s:-1},{t:-1}]
+        heap = [[(0,s)],[(0,t)]]
+        best = INF if s != t else 0
+        meet = s
+        while heap[0] or heap[1]:
+            d = 0 if heap[0] and (not heap[1] or heap[0][0] <= heap[1][0]) else 1
+            (g,v) = heapq.heappop(heap[d])
+            if g >= best:
+                heap[d] = []
+                continue
+            if g > dist[d][v]:
+                continue
+            if v in dist[1-d] and g + dist[1-d][v] < best:
+                best = g + dist[1-d][v]
+                meet = v
+            (ptr,to,cost,mid) = self.up[d]
+            for i in range(ptr[v],ptr[v+1]):
+                w = to[i]
+                gw = g + cost[i]
+                if gw < dist[d].get(w,INF):
+                    dist[d][w] = gw
+                    parent[d][w] = v
+                    heapq.heappush(heap[d],(gw,w))
+        if best == INF:
+            return (INF,None)
+        path = [meet]
+        while parent[0][path[-1]] != -1:
+            path.append(parent[0][path[-1]])
+        path.reverse()
+        while parent[1][path[-1]] != -1:
+            path.append(parent[1][path[-1]])
+        return (float(best),self.unpack(path))
+
+    #  replace each shortcut on path by the two edges it stands for
+    def unpack(self,path):
+        result = [path[0]]
+        stack = [(path[i],path[i+1]) for i in range(len(path)-2,-1,-1)]
+        while stack:
+            (u,w) = stack.pop()
+            v = self.middle(u,w)
+            if v < 0:
+                result.append(w)
+            else:
+                stack.append((v,w))
+                stack.append((u,v))
+        return result
+
+    def middle(self,u,w):
+        if self.rank[u] < self.rank[w]:
+            (ptr,to,cost,mid) = self.up[0]
+            (row,x) = (u,w)
+        else:
+            (ptr,to,cost,mid) = self.up[1]
+            (row,x) = (w,u)
+        best = None
+        for i in range(ptr[row],ptr[row+1]):
+            if to[i] == x and (best is None or cost[i] < cost[best]):
+                best = i
+        return mid[best]
+
+#**********************************************************************
+#   Shortcuts (u,w,cost) needed to contract v: one for each pair of
+#   neighbours u -> v -> w with no witness path from u to w avoiding v
+#   that is as short. Witness searches settle at most settle_max nodes
+#   (if one gives up, the shortcut is added anyway).
+#
+def shortcuts( v, out, inn, settle_max ):
+    found = []
+    for (u,cu) in inn[v].items():
+        targets = {}
+        for (w,cw) in out[v].items():
+            if w != u:
+                targets[w] = cu + cw
+        if not targets:
+            continue
+        bound = max(targets.values())
+        dist = {u:0}
+        heap = [(0,u)]
+        settled = 0
+        left = len(targets)
+        while heap and settled < settle_max and left > 0:
+            (g,x) = heapq.heappop(heap)
+            if g > dist[x]:
+                continue
+            if g > bound:
+                break
+            settled += 1
+            if x in targets:
+                left -= 1
+            for (y,c) in out[x].items():
+                if y != v and g + c <= bound and g + c < dist.get(y,INF):
+                    dist[y] = g + c
+                    heapq.heappush(heap,(g + c,y))
+        for (w,c) in targets.items():
+            if dist.get(w,INF) > c:
+                found.append((u,w,c))
+    return found
+
+#**********************************************************************
+#   The graph of the environment chosen by args, and its name.
+#
+def env_graph( args ):
+    from file_graph import Graph
+    if args.env == 'file':
+        if args.graph is None:
+            print('--env file needs --graph')
+            sys.exit(1)
+        graph = Graph.load(args.graph,args.directed,args.coords)
+        return (graph,os.path.basename(args.graph))
+    elif args.env in ['romania','graph']:
+        module = __import__(args.env)
+        return (Graph.from_adjacency(module.adjacent),args.env)
+    else:
+        print('No static graph for environment:',args.env)
+        sys.exit(1)
+
+def answer( oracle, graph, start, goal ):
+    t0 = time.perf_counter()
+    (cost,path) = oracle.query(graph.node_id(start),graph.node_id(goal))
+    result = {'start':start,'goal':goal}
+    result['time_us'] = round(1e6*(time.perf_counter() - t0),1)
+    if path is None:
+        result['status'] = 'unsolvable'
+    else:
+        result['status'] = 'solved'
+        result['path'] = [str(graph.names[v]) for v in path]
+        result['cost'] = int(cost) if cost.is_integer() else cost
+    return result
+
+#**********************************************************************
+#   Compare the oracle with uniform cost search on random pairs.
+#
+def verify( oracle, graph, args, count ):
+    from node_heap import Node, Counters
+    from search import load_env, run_search
+    args.s = 'ucs'
+    args.closed = True
+    args.quiet = True
+    args.v = False
+    args.h = None
+    args.search_stats = None
+    args.out = sys.stdout
+    State = load_env(args)
+    rng = random.Random(1)
+    wrong = 0
+    for i in range(count):
+        start = str(graph.names[rng.randrange(graph.n)])
+        goal = str(graph.names[rng.randrange(graph.n)])
+        result = answer(oracle,graph,start,goal)
+        State.set_goal(goal)
+        args.start = start
+        node = Node(State.start_state(args),None,None,0,0,args.s,args.w,
+                    Counters())
+        (node,num_expand,expanded) = run_search(node,args)
+        ucs = INF if node is None else node.g
+        cost = result.get('cost',INF)
+        if abs(cost - ucs) > 1e-9*max(1,abs(ucs)) and cost != ucs:
+            wrong += 1
+            print('Mismatch:',start,goal,'oracle:',cost,'ucs:',ucs)
+        elif not node is None and not valid_path(graph,result['path'],cost):
+            wrong += 1
+            print('Invalid path:',start,goal,result['path'])
+    print('Verified',count,'queries against ucs:',wrong,'wrong.')
+    return wrong == 0
+
+#  True if path follows edges of graph and has the given cost
+def valid_path( graph, path, cost ):
+    total = 0
+    for i in range(len(path)-1):
+        u = graph.node_id(path[i])
+        v = graph.node_id(path[i+1])
+        row = range(graph.indptr[u],graph.indptr[u+1])
+        costs = [graph.weights[j] for j in row if graph.indices[j] == v]
+        if not costs:
+            return False
+        total += min(costs)
+    return abs(total - cost) <= 1e-9*max(1,abs(cost))
+
+
+def main():
+    from search import make_parser
+    from batch import read_instances
+    parser = make_parser()
+    parser.add_argument('--method',type=str,default='auto',
+                        help='oracle index: table, ch or auto (by size)')
+    parser.add_argument('--table_max',type=int,default=2048,
+                        help='largest graph (nodes) indexed by a table')
+    parser.add_argument('--oracle_dir',type=str,default='oracle',
+                        help='directory holding the oracle indexes')
+    parser.add_argument('--queries',type=str,default=None,
+                        help='file of start goal lines to answer (- for stdin)')
+    parser.add_argument('--verify',type=int,default=0,
+                        help='check this many random queries against ucs')
+    args = parser.parse_args()
+
+    (graph,name) = env_graph(args)
+    oracle = load_oracle(graph,name,args.method,args.table_max,
+                         args.oracle_dir)
+    if args.verify > 0:
+        if not verify(oracle,graph,args,args.verify):
+            sys.exit(1)
+    elif not args.queries is None:
+        file = sys.stdin if args.queries == '-' else open(args.queries)
+        for (index,start,goal) in read_instances(file):
+            result = answer(oracle,graph,start,goal)
+            result['index'] = index
+            print(json.dumps(result),flush=True)
+    else:
+        from search import load_env
+        state = load_env(args).start_state(args)
+        start = str(state)
+        goal = str(state.target_state())
+        result = answer(oracle,graph,start,goal)
+        if result['status'] == 'solved':
+            print('->'.join(result['path']))
+            print('Length:',len(result['path'])-1,end='.')
+            print(' Cost:',result['cost'],end='.')
+        else:
+            print('No path from',start,'to',goal,end='.')
+        print(' Time: %.1fus' % result['time_us'])
+
+
+if __name__ == '__main__':
+    main()
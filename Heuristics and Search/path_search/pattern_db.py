@@ -0,0 +1,272 @@
+#**********************************************************************
+#   pattern_db.py
+#
+#   Additive disjoint pattern databases for the sliding tile puzzle.
+#
+#   The tiles are split into disjoint groups. For each group, a table
+#   gives the number of moves of that group's tiles needed to bring them
+#   from any placement to their goal positions, where moves of all other
+#   tiles are free. Since each move slides a single tile, the sum over
+#   all groups is admissible.
+#
+#   A placement of the k tiles of a group on the n cells of the board is
+#   indexed by its rank as a k-permutation of n, so a table has exactly
+#   n!/(n-k)! uint8 entries. Tables are built offline by retrograde
+#   breadth first search from the goal and saved as .npy files, which
+#   are opened with np.load(mmap_mode='r') at search time so that
+#   several solver processes share one page-cached copy. Building needs
+#   n!/(n-k-1)! bytes, which rules out groups of 8 tiles on small boxes.
+#
+#   python3 pattern_db.py --rows 4 --pdb 6-6-3
+#   python3 search.py --rows 4 --s astar --h pdb --pdb 6-6-3
+#
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+#**********************************************************************
+#   Named partitions of the tiles, for each board size.
+#
+PARTITIONS = {
+    (3,3): {'4-4':[[1,2,4,5],[3,6,7,8]]},
+    (3,4): {'6-5':[[1,2,5,6,9,10],[3,4,7,8,11]]},
+    (4,4): {'6-6-3':[[1,5,6,9,10,13],[7,8,11,12,14,15],[2,3,4]],
+            '7-8':[[1,5,6,9,10,13,14],[2,3,4,7,8,11,12,15]]},
+    (5,5): {'5-5-5-5-4':[[1,2,6,7,11],[3,4,5,8,9],[10,14,15,19,20],
+                         [12,13,16,17,18],[21,22,23,24]]}}
+
+UNSEEN = 255
+
+#**********************************************************************
+#   Return the tile groups named by spec, which is either the name of a
+#   partition (e.g. '6-6-3') or explicit groups such as '1,2,3/4,5,6'.
+#   If spec is None, the first partition listed for the board is used.
+#
+def partition( rows, cols, spec ):
+    named = PARTITIONS.get((rows,cols),{})
+    if spec is None and named:
+        return list(named.values())[0]
+    if spec in named:
+        return named[spec]
+    if spec is None or spec.strip('0123456789,/') != '':
+        sys.exit('Unknown partition %s for %d x %d board. Known: %s'
+                 % (spec,rows,cols,', '.join(named.keys())))
+    groups = []
+    for part in spec.split('/'):
+        groups.append([int(t) for t in part.split(',')])
+    tiles = sorted([t for group in groups for t in group])
+    if len(set(tiles)) != len(tiles) or tiles[0] < 1 or tiles[-1] >= rows*cols:
+        sys.exit('Invalid partition: %s' % spec)
+    return groups
+
+def table_path( rows, cols, group, pdb_dir ):
+    name = 'pdb-%dx%d-%s.npy' % (rows,cols,'_'.join(str(t) for t in group))
+    return os.path.join(pdb_dir,name)
+
+#**********************************************************************
+#   Ranking of k-permutations of n (positions of the k tiles of a group).
+#   factors[i] = (n-1-i)!/(n-k)!, so rank = sum_i c_i*factors[i], where
+#   c_i is the number of unused cells before the cell of tile i.
+#
+def rank_factors( n, k ):
+    factors = [1]*k
+    for i in range(k-2,-1,-1):
+        factors[i] = factors[i+1]*(n-1-i)
+    return factors
+
+def table_size( n, k ):
+    return rank_factors(n,k)[0]*n
+
+def rank( pos, factors ):
+    r = 0
+    for i in range(len(pos)):
+        c = pos[i]
+        for j in range(i):
+            if pos[j] < pos[i]:
+                c -= 1
+        r += c*factors[i]
+    return r
+
+def rank_array( pos, factors ):
+    r = np.zeros(len(pos),dtype=np.int64)
+    for i in range(pos.shape[1]):
+        c = pos[:,i].astype(np.int64)
+        for j in range(i):
+            c -= pos[:,j] < pos[:,i]
+        r += c*factors[i]
+    return r
+
+def unrank_array( r, n, factors ):
+    k = len(factors)
+    pos = np.zeros((len(r),k),dtype=np.int8)
+    free = np.ones((len(r),n),dtype=bool)
+    rows = np.arange(len(r))
+    for i in range(k):
+        c = r // factors[i]
+        r = r % factors[i]
+        # cell of tile i is the (c+1)-th free cell
+        cell = np.argmax(np.cumsum(free,axis=1) > c[:,None],axis=1)
+        pos[:,i] = cell
+        free[rows,cell] = False
+    return pos
+
+#**********************************************************************
+#   Build the table for one group by breadth first search backwards
+#   from the goal. The search runs over placements of the group's tiles
+#   and the blank, ranked as (k+1)-permutations with the blank last.
+#   Sliding a tile of the group into the blank costs 1; sliding any
+#   other tile only moves the blank, and costs 0. The stored table is
+#   the minimum over blank positions, indexed by the rank of the tiles.
+#
+def build_table( rows, cols, group, chunk=1<<20 ):
+    n = rows*cols
+    k = len(group)
+    factors = rank_factors(n,k+1)
+    dist = np.full(table_size(n,k+1),UNSEEN,dtype=np.uint8)
+    goal = np.array([[t-1 for t in group]+[n-1]],dtype=np.int8)
+    dist[rank_array(goal,factors)] = 0
+    steps = [(1,0),(0,1),(0,-1),(-1,0)]
+    d = 0
+    frontier = rank_array(goal,factors)
+    while len(frontier) > 0:
+        # closure under free moves of the blank, within level d
+        while len(frontier) > 0:
+            found = []
+            for c0 in range(0,len(frontier),chunk):
+                pos = unrank_array(frontier[c0:c0+chunk],n,factors)
+                for (dr,dc) in steps:
+                    (p1,ok) = move_blank(pos,rows,cols,dr,dc)
+                    for i in range(k):
+                        ok &= p1[:,k] != pos[:,i]
+                    new = rank_array(p1[ok],factors)
+                    new = np.unique(new[dist[new] == UNSEEN])
+                    dist[new] = d
+                    found.append(new)
+            frontier = np.concatenate(found)
+        # moves of the group's tiles lead to level d+1
+        level = np.flatnonzero(dist == d)
+        for c0 in range(0,len(level),chunk):
+            pos = unrank_array(level[c0:c0+chunk],n,factors)
+            for (dr,dc) in steps:
+                (p1,ok) = move_blank(pos,rows,cols,dr,dc)
+                hit = np.zeros(len(pos),dtype=bool)
+                for i in range(k):
+                    swap = ok & (p1[:,k] == pos[:,i])
+                    p1[swap,i] = pos[swap,k]
+                    hit |= swap
+                new = rank_array(p1[hit],factors)
+                new = new[dist[new] == UNSEEN]
+                dist[new] = d+1
+        d += 1
+        frontier = np.flatnonzero(dist == d)
+    return dist.reshape(-1,n-k).min(axis=1)
+
+#**********************************************************************
+#   Move the blank (last column of pos) by (dr,dc). Return the new
+#   placements and a mask of those where the blank stayed on the board.
+#
+def move_blank( pos, rows, cols, dr, dc ):
+    r1 = pos[:,-1] // cols + dr
+    c1 = pos[:,-1] % cols + dc
+    ok = (r1 >= 0) & (r1 < rows) & (c1 >= 0) & (c1 < cols)
+    p1 = pos.copy()
+    p1[:,-1] = np.where(ok,r1*cols + c1,pos[:,-1])
+    return (p1,ok)
+
+#**********************************************************************
+#   Heuristic for sliding.State: the sum of the table entries of all
+#   groups. When a tile moves, only the entry of its group changes.
+#
+class PatternDB:
+
+    def __init__(self,geo,groups,tables):
+        self.geo = geo
+        self.groups = groups
+        self.tables = tables
+        self.factors = [rank_factors(geo.n,len(group)) for group in groups]
+        # group_of[t] and slot_of[t] locate tile t in the groups
+        self.group_of = [-1]*geo.n
+        self.slot_of = [-1]*geo.n
+        for g in range(len(groups)):
+            for i in range(len(groups[g])):
+                self.group_of[groups[g][i]] = g
+                self.slot_of[groups[g][i]] = i
+        self.last_p = None
+        self.where = None
+
+    def load(geo,spec,pdb_dir='pdb'):
+        if geo.goal_p != geo.pack(list(range(1,geo.n)) + [0]):
+            sys.exit('Pattern databases are only built for the standard goal.')
+        groups = partition(geo.rows,geo.cols,spec)
+        tables = []
+        for group in groups:
+            path = table_path(geo.rows,geo.cols,group,pdb_dir)
+            if not os.path.exists(path):
+                sys.exit('Missing pattern database %s\n'
+                         'Build it with: python3 pattern_db.py --rows %d'
+                         ' --cols %d --pdb %s --pdb_dir %s'
+                         % (path,geo.rows,geo.cols,
+                            ','.join(str(t) for t in group),pdb_dir))
+            tables.append(np.load(path,mmap_mode='r'))
+        return PatternDB(geo,groups,tables)
+
+    def locate(self,p):
+        if p != self.last_p:               # children share their parent
+            self.where = self.geo.unpack_positions(p)
+            self.last_p = p
+        return self.where
+
+    def value(self,g,where):
+        pos = [where[t] for t in self.groups[g]]
+        return int(self.tables[g][rank(pos,self.factors[g])])
+
+    def evaluate(self,state):
+        where = self.locate(state.p)
+        h = 0
+        for g in range(len(self.groups)):
+            h += self.value(g,where)
+        return h
+
+    def update(self,parent,child,t,j,k):
+        g = self.group_of[t]
+        if g < 0:
+            return parent.h
+        where = self.locate(parent.p)
+        pos = [where[x] for x in self.groups[g]]
+        table = self.tables[g]
+        factors = self.factors[g]
+        h0 = table[rank(pos,factors)]
+        pos[self.slot_of[t]] = k
+        h1 = table[rank(pos,factors)]
+        return parent.h - int(h0) + int(h1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows',type=int,default=4,
+                        help='rows in sliding tile puzzle')
+    parser.add_argument('--cols',type=int,default=0,
+                        help='cols in sliding tile puzzle')
+    parser.add_argument('--pdb',type=str,default=None,
+                        help='partition name (e.g. 6-6-3) or groups 1,2,3/4,5,6')
+    parser.add_argument('--pdb_dir',type=str,default='pdb',
+                        help='directory holding the pattern databases')
+    args = parser.parse_args()
+    rows = args.rows
+    cols = args.cols if args.cols > 0 else rows
+
+    os.makedirs(args.pdb_dir,exist_ok=True)
+    for group in partition(rows,cols,args.pdb):
+        path = table_path(rows,cols,group,args.pdb_dir)
+        t0 = time.time()
+        dist = build_table(rows,cols,group)
+        np.save(path,dist)
+        print(path,'entries:',len(dist),'max:',int(dist.max()),
+              'time: %.1fs' % (time.time()-t0))
+
+
+if __name__ == '__main__':
+    main()
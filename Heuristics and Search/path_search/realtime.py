@@ -0,0 +1,182 @@
+#**********************************************************************
+#   realtime.py
+#
+#   Real-time search for search.py. Instead of planning the whole path
+#   first, the agent looks ahead from where it is with at most
+#   --lookahead expansions of A*, moves along the path to the best
+#   frontier state (least g + h), and repeats from there until it
+#   reaches the goal, so the time taken for each move is bounded. The
+#   heuristic is learned as it goes, in a dict keyed by state (starting
+#   from the h of the environment), after each lookahead:
+#     lrtastar  LRTA*: each state expanded gets the least cost from it
+#               to the frontier plus h there (a Dijkstra backup)
+#     rtaastar  RTAA*: each state expanded gets f - g, with f that of
+#               the best frontier state (cheaper, and less informed)
+#   With --trials the agent starts again from the start, keeping what
+#   it has learned, until a trial changes no h (the path it then takes
+#   is optimal, if h is admissible) or the trials run out. The path
+#   shown is that of the last trial, with the time taken by each move
+#   (lookahead and learning).
+#
+#   Move pruning (--prune) depends on the path taken, and an agent may
+#   need to go back, so it is turned off here.
+#
+#   python3 search.py --env romania --start lugoj --goal neamt --s lrtastar --trials 50
+#   python3 search.py --env sliding --start 867254301 --s rtaastar --lookahead 100 --trials 1000 --quiet
+#
+import heapq
+import time
+
+from node_heap import Node
+from limits import check_limits
+from stats import heap_ops
+
+#**********************************************************************
+#  Run trials from start. Return the goal node of the last trial (or
+#  None), the number of nodes expanded, and the number of trials,
+#  whether they converged, and the moves and time for each move.
+#
+def realtime_search( start, args ):
+    State = type(start.state)
+    pruning = getattr(State,'pruning',None)
+    if not pruning is None:
+        State.pruning = None
+    try:
+        return run_trials(start,args)
+    finally:
+        if not pruning is None:
+            State.pruning = pruning
+
+def run_trials( start, args ):
+    learned = {}                 # key -> learned h
+    num_expand = 0
+    generated = 0
+    latency = []
+    converged = False
+    for trial in range(1,max(args.trials,1)+1):
+        node = start
+        updates = 0
+        while not node.state.is_goal():
+            t0 = time.perf_counter()
+            (path,expanded,children,changed) = step(node.state,learned,
+                                                    num_expand,args)
+            latency.append(time.perf_counter() - t0)
+            num_expand += expanded
+            generated += children
+            updates += changed
+            if path is None:
+                start.counters.tick = generated + 1
+                return (None,num_expand,None)
+            for (state,act,cost) in path:
+                node = Node(state,node,act,node.depth+1,node.g+cost,
+                            args.s,args.w)
+                if args.v:
+                    node.print_node_ghf(args,args.unique)
+        if not args.quiet:
+            print('trial:',trial,end='.',file=args.out)
+            print(' Cost:',node.g,end='.',file=args.out)
+            print(' Moves:',node.depth,end='.',file=args.out)
+            print(' Updates:',updates,file=args.out)
+        if updates == 0:
+            converged = True
+            break
+    start.counters.tick = generated + 1
+    return (node,num_expand,
+            {'Trials':trial,'Converged':converged,'Moves':len(latency),
+             'Mean move time':'%.3fms' % (1000*sum(latency)
+                                          /max(len(latency),1)),
+             'Max move time':'%.3fms' % (1000*max(latency,default=0))})
+
+#**********************************************************************
+#  Look ahead from state with A*, learn, and return the moves
+#  (state,action,cost) to the best frontier state (None if no state is
+#  left to go to), the number of nodes expanded and generated, and the
+#  number of learned h values that went up.
+#
+def step( state, learned, done, args ):
+
+    def h( key, state ):
+        return learned.get(key,state.h)
+
+    root = state.key()
+    best_g = {root:0}
+    states = {root:state}
+    parent = {root:None}          # key -> (parent key, action, cost)
+    preds = {}                    # key -> [(parent key, cost)]
+    closed = set()
+    heap = []
+    (push,pop) = heap_ops(args)
+    push(heap,(h(root,state),0,0,root))
+    tick = 0
+    expanded = 0
+    generated = 0
+    while heap:
+        (f,minus_g,t,key) = heap[0]
+        if -minus_g != best_g[key] or key in closed:
+            pop(heap)
+            continue
+        state = states[key]
+        if state.is_goal() or expanded >= max(args.lookahead,1):
+            break
+        pop(heap)
+        closed.add(key)
+        expanded += 1
+        check_limits(done + expanded,args)
+        if args.search_stats is None:
+            children = state.expand()
+        else:
+            children = args.search_stats.expand(state)
+        generated += len(children)
+        for (child,act,cost) in children:
+            k = child.key()
+            g = best_g[key] + cost
+            preds.setdefault(k,[]).append((key,cost))
+            if k in best_g and best_g[k] <= g:
+                continue
+            best_g[k] = g
+            states[k] = child
+            parent[k] = (key,act,cost)
+            closed.discard(k)
+            tick += 1
+            push(heap,(g + h(k,child),-g,tick,k))
+    if not args.search_stats is None:
+        args.search_stats.resize(-len(heap))
+    if not heap:
+        return (None,expanded,generated,0)
+    goal = heap[0][3]
+
+    if args.s == 'rtaastar':
+        f = best_g[goal] + h(goal,states[goal])
+        values = {key:f - best_g[key] for key in closed}
+    else:
+        values = backup(closed,preds,best_g,states,h)
+    changed = 0
+    for (key,value) in values.items():
+        if value > h(key,states[key]):
+            learned[key] = value
+            changed += 1
+
+    path = []
+    key = goal
+    while key != root:
+        (prev,act,cost) = parent[key]
+        path.append((states[key],act,cost))
+        key = prev
+    path.reverse()
+    return (path,expanded,generated,changed)
+
+#  the least cost from each closed state to a frontier state plus its
+#  h, by Dijkstra's algorithm backwards from the frontier
+def backup( closed, preds, best_g, states, h ):
+    value = {}
+    queue = [(h(key,states[key]),key) for key in best_g if not key in closed]
+    heapq.heapify(queue)
+    while queue:
+        (v,key) = heapq.heappop(queue)
+        if key in closed and value.get(key) != v:
+            continue
+        for (prev,cost) in preds.get(key,[]):
+            if prev in closed and v + cost < value.get(prev,float('inf')):
+                value[prev] = v + cost
+                heapq.heappush(queue,(v + cost,prev))
+    return value
@@ -0,0 +1,176 @@
+#**********************************************************************
+#   regression.py
+#
+#   Regression cases for search.py, covering every strategy, queue and
+#   tie order, the heuristics and move pruning, and bugs fixed: small
+#   fixed queries, each solved through solver.py and compared with the status
+#   and cost expected (checked against astar, or by hand). For rbfs and
+#   smastar the peak nodes held must also be within --max_nodes. Each
+#   query runs under --max_expand, so a case that would not terminate
+#   fails as a limit. The failing cases are printed, and the exit
+#   status is then 1.
+#
+#   python3 regression.py
+#   python3 regression.py --v
+#
+import argparse
+import sys
+
+from solver import solve
+
+#  (name, options of solver.solve, status, cost)
+CASES = []
+
+#  every strategy on the romania map, from arad to bucharest (the goal
+#  of the table heuristic) and, with --h alt, from dobreta to fagaras:
+#  the cheapest path (418, 445) for those that find it, otherwise the
+#  path found first (450, 570), as tree search, graph search (--closed)
+#  and iterative deepening (--id)
+OPTIMAL = ['ucs','astar','heuristic','biucs','biastar','rbfs','smastar',
+           'arastar','hdastar','lrtastar','rtaastar']
+for strategy in ['bfs','bfs1','ucs','dfs','greedy','astar','heuristic',
+                 'bibfs','biucs','biastar','rbfs','smastar','arastar',
+                 'hdastar','lrtastar','rtaastar']:
+    options = dict(env='romania',strategy=strategy,hda_workers=2,trials=100)
+    best = strategy in OPTIMAL
+    CASES.append(('romania %s' % strategy,options,'solved',
+                  418 if best else 450))
+    CASES.append(('romania %s --closed' % strategy,
+                  dict(options,closed=True),'solved',418 if best else 450))
+    CASES.append(('romania %s --h alt --goal fagaras' % strategy,
+                  dict(options,heuristic='alt',start='dobreta',goal='fagaras'),
+                  'solved',445 if best or strategy == 'greedy' else 570))
+    if strategy in ['bfs','bfs1','ucs','dfs','greedy','astar','heuristic']:
+        CASES.append(('romania %s --id' % strategy,dict(options,id=True),
+                      'solved',418 if best else 450))
+
+#  every strategy on the sliding tile puzzle, from a start 14 moves from
+#  the goal (dfs, without a bound, only with --id, from a start 6 moves
+#  away), and the --h alt heuristic of the other maps
+for strategy in ['bfs','bfs1','ucs','astar','bibfs','biucs','biastar','rbfs',
+                 'smastar','arastar','hdastar','lrtastar','rtaastar','lbfs',
+                 'ebfs']:
+    CASES.append(('sliding %s' % strategy,
+                  dict(strategy=strategy,start='236147058',hda_workers=2,
+                       trials=1000),'solved',14))
+for (name,strategy,weight,start,cost) in [
+        ('greedy','greedy',1.0,'236147058',22),
+        ('heuristic --w 1.5','heuristic',1.5,'236147058',22),
+        ('heuristic --w 0','heuristic',0.0,'130526478',6)]:
+    CASES.append(('sliding %s --start %s' % (name,start),
+                  dict(strategy=strategy,weight=weight,start=start),
+                  'solved',cost))
+for strategy in ['bfs','ucs','dfs','astar']:
+    CASES.append(('sliding %s --id' % strategy,
+                  dict(strategy=strategy,start='130526478',id=True),
+                  'solved',6))
+for heuristic in ['manhattan','linear','walking']:
+    CASES.append(('sliding astar --h %s' % heuristic,
+                  dict(strategy='astar',start='236147058',heuristic=heuristic),
+                  'solved',14))
+for prune in ['none','inverse','cycles']:
+    CASES.append(('sliding astar --prune %s' % prune,
+                  dict(strategy='astar',start='236147058',prune=prune),
+                  'solved',14))
+CASES.append(('graph astar --h alt --start A --goal Z',
+              dict(env='graph',strategy='astar',heuristic='alt',start='A',
+                   goal='Z'),'solved',11))
+CASES.append(('file astar --h alt --start dobreta --goal fagaras',
+              dict(env='file',graph='romania_map.csv',strategy='astar',
+                   heuristic='alt',start='dobreta',goal='fagaras'),
+              'solved',445))
+
+#  a start of the wrong parity is unsolvable, and is found so before any
+#  search
+for strategy in ['astar','lbfs']:
+    CASES.append(('sliding %s --start 213456780' % strategy,
+                  dict(strategy=strategy,start='213456780'),'unsolvable',None))
+
+#  every queue with every tie order: astar (integer costs), ucs on the
+#  romania map, and heuristic with a weight giving fractional costs
+for queue in ['auto','bucket','heapq','heap']:
+    for tie in ['fifo','lifo','high_g']:
+        CASES.append(('sliding astar --closed --queue %s --tie %s' % (queue,tie),
+                      dict(strategy='astar',start='236147058',closed=True,
+                           queue=queue,tie=tie),'solved',14))
+        CASES.append(('romania ucs --queue %s --tie %s' % (queue,tie),
+                      dict(env='romania',strategy='ucs',queue=queue,tie=tie),
+                      'solved',418))
+        CASES.append(('sliding heuristic --w 1.5 --queue %s --tie %s'
+                      % (queue,tie),
+                      dict(strategy='heuristic',weight=1.5,start='236147058',
+                           queue=queue,tie=tie),'solved',22))
+
+#  smastar on budgets too small for the optimal path (15, 6 moves) must
+#  finish, with the best solution that fits, or none (which is a limit,
+#  not an unsolvable start)
+for (budget,cost) in [(2,None),(3,None),(4,None),(5,17),(6,16),(7,15),
+                      (8,15),(9,15),(10,15),(20,15),(5000,15)]:
+    CASES.append(('graph smastar --max_nodes %d' % budget,
+                  dict(env='graph',strategy='smastar',max_nodes=budget),
+                  'limit' if cost is None else 'solved',cost))
+CASES.append(('sliding smastar --max_nodes 8',
+              dict(strategy='smastar',start='236147058',max_nodes=8),
+              'limit',None))
+
+#  a start found by a random walk (--d) must be searched as if given by
+#  --start, whatever moves the walk took (move pruning starts afresh),
+#  and the same seed must give the same walk
+for (seed,board,cost) in [(1,'236147058',14),(2,'130526478',6),
+                          (3,'416738025',12)]:
+    CASES.append(('sliding astar --start %s' % board,
+                  dict(strategy='astar',start=board),'solved',cost))
+    CASES.append(('sliding astar --d 30 --seed %d' % seed,
+                  dict(strategy='astar',rows=3,d=30,seed=seed),'solved',cost))
+
+#  the layered searches must rebuild a path that reaches the goal, from
+#  a start found by a random walk (--d)
+for strategy in ['lbfs','ebfs']:
+    CASES.append(('sliding %s --d 30 --seed 1' % strategy,
+                  dict(strategy=strategy,rows=3,d=30,seed=1),'solved',14))
+
+#  hdastar workers load the environment again, and must search for the
+#  goal of the query, not the default goal of the graph
+for strategy in ['astar','hdastar']:
+    CASES.append(('file %s --start arad --goal bucharest' % strategy,
+                  dict(env='file',graph='romania_map.csv',start='arad',
+                       goal='bucharest',strategy=strategy,hda_workers=2),
+                  'solved',418))
+
+#**********************************************************************
+#  Run a case and return what is wrong with its result (or None).
+#
+def check( options, status, cost ):
+    result = solve(max_expand=100000,**options)
+    if result.status != status:
+        problem = 'status %s, not %s' % (result.status,status)
+        if not result.message is None:
+            problem += ' (%s)' % result.message
+        return problem
+    if result.cost != cost:
+        return 'cost %s, not %s' % (result.cost,cost)
+    peak = (result.counts or {}).get('Peak nodes')
+    if not peak is None and peak > options.get('max_nodes',peak):
+        return 'peak nodes %d, above %d' % (peak,options['max_nodes'])
+    return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--v',action='store_true',
+                        help='print every case, not only those failing')
+    args = parser.parse_args()
+    failed = 0
+    for (name,options,status,cost) in CASES:
+        problem = check(options,status,cost)
+        if not problem is None:
+            failed += 1
+            print('FAIL',name + ':',problem)
+        elif args.v:
+            print('ok  ',name)
+    print('%d of %d cases passed.' % (len(CASES) - failed,len(CASES)))
+    if failed > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
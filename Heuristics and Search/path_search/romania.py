@@ -9,6 +9,8 @@
 import numpy as np
 import random
 
+from map_state import MapState, reverse_adjacency
+
 adjacent = {
     'arad':[('sibiu',140),('timisoara',118),('zerind',75)],
     'bucharest':[('fagaras',211),('giurgiu',90),
@@ -39,40 +41,15 @@ heuristic = {
     'oradea':380,'pitesti':98,'rimnicu vilcea':193,'sibiu':253,
     'timisoara':329,'urziceni':80,'vaslui':199,'zerind':374}
 
-class State:
-
-    goal = 'bucharest'
-    
-    def __init__(self,a='arad'):
-        self.a = a
-        self.h = heuristic[a]
-        
-    def start_state(args):
-        if args.start is None:
-            return State('arad')
-        else:
-            return State(args.start)
-        
-    def set_goal(goal):
-        State.goal = goal
-
-    def is_equal_to(self,other):
-        return(self.a == other.a)
-
-    def expand( self ):
-        children = []
-        for (state,cost) in adjacent[self.a]:
-            children.append((State(state),'-',cost))
-        return children
-
-    def is_goal( self ):
-        return self.a == State.goal
+class State(MapState):
 
-    def heuristic( self ):
-        return heuristic[self.a]
-        
-    def print_action(self,action):
-        print('->',end='')
+    adjacent = adjacent
+    reverse_adjacent = reverse_adjacency(adjacent)
+    fixed_table = heuristic
+    map_name = 'romania'
+    default_start = 'arad'
+    default_goal = 'bucharest'
 
-    def print_state(self):
-        print(self.a,end='')
+    goal = default_goal
+    table = heuristic
+    landmarks = None
@@ -8,26 +8,110 @@
 import numpy as np
 import random
 import argparse
+import sys
 
-from node_heap import Node, MyHeap
+from node_heap import Node, Counters, MyHeap, LazyHeap, BucketQueue
+from limits import LimitReached, check_limits, start_clock
 
 
 def main():
+    args = make_parser().parse_args()
+    args.search_stats = None
+    args.out = sys.stdout
+    args.counters = Counters()
+
+    if not args.batch is None:
+        from batch import solve_batch
+        solve_batch(args)
+        return
+
+    if not args.seed is None:
+        random.seed(args.seed)
+    State = load_env(args)
+    start_state = State.start_state(args)
+    
+    print('Start:',end='')
+    start_state.print_state()
+    print()
+    if args.stats in ['text','json']:
+        from stats import SearchStats
+        args.search_stats = SearchStats(args.counters)
+        args.search_stats.watch_heuristic(start_state)
+    elif not args.stats is None:
+        sys.exit('Unknown stats format: %s' % args.stats)
+    if not args.profile is None:
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+    start = Node(start_state,None,None,0,0,args.s,args.w,args.counters)
+    try:
+        (node,num_expand,counts) = run_search(start,args)
+    except LimitReached as limit:
+        print('Search abandoned:',limit)
+        node = False
+    if not args.profile is None:
+        profile.disable()
+    if node is None:
+        print('No solution found.')
+    elif node:
+        print_solution(node,num_expand,args)
+    if node and not counts is None:
+        print(' '.join('%s: %s.' % item for item in counts.items()))
+    if not args.search_stats is None:
+        args.search_stats.print_report(args.stats)
+    if not args.profile is None:
+        import pstats
+        pstats.Stats(profile).sort_stats(args.profile).print_stats(30)
+
+#**********************************************************************
+#  Command line options, shared with the tools built on search.py.
+#
+def make_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument('--s',type=str,default='bfs',
-                        help= 'bfs,bfs1,ucs,dfs,greedy,astar or heuristic')
+                        help= 'bfs,bfs1,ucs,dfs,greedy,astar,heuristic,'
+                              'bibfs,biucs,biastar,rbfs,smastar,arastar,'
+                              'hdastar,lrtastar,rtaastar, lbfs or ebfs (sliding)')
     parser.add_argument('--id',action='store_true',default=False,
                         help='iterative deepening')
     parser.add_argument('--w',type=float,default=1.0,
-                        help='weight for heuristic search')
+                        help='weight for heuristic search (first weight for arastar)')
+    parser.add_argument('--w_step',type=float,default=0.5,
+                        help='amount arastar lowers the weight by each time')
+    parser.add_argument('--lookahead',type=int,default=1,
+                        help='expansions before each move of lrtastar, rtaastar')
+    parser.add_argument('--trials',type=int,default=1,
+                        help='most trials of lrtastar, rtaastar (until converged)')
+    parser.add_argument('--h',type=str,default=None,
+                        help='heuristic: manhattan, linear, walking or pdb (sliding);'
+                             ' table or alt (romania, graph); straight or alt (file)')
+    parser.add_argument('--pdb',type=str,default=None,
+                        help='pattern database partition, e.g. 6-6-3 or 7-8')
+    parser.add_argument('--pdb_dir',type=str,default='pdb',
+                        help='directory holding the pattern databases')
+    parser.add_argument('--landmarks',type=int,default=8,
+                        help='number of landmarks for --h alt')
+    parser.add_argument('--alt_dir',type=str,default='alt',
+                        help='directory holding the landmark tables')
     parser.add_argument('--env',type=str,default='sliding',
-                        help='sliding, romania or graph')
+                        help='sliding, romania, graph or file')
+    parser.add_argument('--graph',type=str,default=None,
+                        help='graph file for --env file (edge list or DIMACS .gr)')
+    parser.add_argument('--coords',type=str,default=None,
+                        help='node coordinates for --env file')
+    parser.add_argument('--directed',action='store_true',default=False,
+                        help='edges in a --graph edge list are directed')
     parser.add_argument('--rows',type=int,default=4,
                         help='rows in sliding tile puzzle')
     parser.add_argument('--cols',type=int,default=0,
                         help='cols in sliding tile puzzle')
+    parser.add_argument('--prune',type=str,default='cycles',
+                        help='move pruning in sliding tile puzzle: none, '
+                             'inverse or cycles')
     parser.add_argument('--d',type=int,default=10,
                         help='depth of (random) initial state')
+    parser.add_argument('--seed',type=int,default=None,
+                        help='seed for the random initial state')
     parser.add_argument('--start',type=str,default=None,help='start state')
     parser.add_argument('--goal',type=str,default=None,help='goal state')
     parser.add_argument('--v',action='store_true',default=False,help='verbose')
@@ -35,91 +119,349 @@ def main():
                         help='print each expanded state only once')
     parser.add_argument('--shuffle',action='store_true',default=False,
                         help='shuffle generated nodes in random order')
-    args = parser.parse_args()
+    parser.add_argument('--closed',action='store_true',default=False,
+                        help='graph search (closed set instead of ancestor check)')
+    parser.add_argument('--max_nodes','--max-nodes',type=int,default=100000,
+                        help='nodes kept in memory by --s smastar')
+    parser.add_argument('--memory',type=int,default=1024,
+                        help='memory for arrays in --s ebfs (MB)')
+    parser.add_argument('--ebfs_dir',type=str,default='ebfs',
+                        help='directory for the layer files of --s ebfs')
+    parser.add_argument('--queue',type=str,default='auto',
+                        help='priority queue: auto, bucket, heapq or heap')
+    parser.add_argument('--tie',type=str,default='fifo',
+                        help='among equal costs, take first: fifo, lifo '
+                             'or high_g')
+    parser.add_argument('--quiet',action='store_true',default=False,
+                        help='no progress output')
+    parser.add_argument('--time_limit','--time-limit',type=float,default=None,
+                        help='give up after this many seconds')
+    parser.add_argument('--max_expand','--max-expand',type=int,default=None,
+                        help='give up after expanding this many nodes')
+    parser.add_argument('--batch',type=str,default=None,
+                        help='file of start [goal] lines to solve (- for stdin)')
+    parser.add_argument('--workers',type=int,default=0,
+                        help='worker processes for --batch or server.py'
+                             ' (0: one per cpu)')
+    parser.add_argument('--hda_workers',type=int,default=0,
+                        help='worker processes for --s hdastar (0: one per cpu)')
+    parser.add_argument('--hda_batch',type=int,default=64,
+                        help='children sent to another worker at once by hdastar')
+    parser.add_argument('--stats',type=str,nargs='?',const='text',default=None,
+                        help='report search statistics as text or json'
+                             ' (tracemalloc slows the search down)')
+    parser.add_argument('--profile',type=str,nargs='?',const='cumulative',
+                        default=None,
+                        help='profile the search with cProfile; optional sort'
+                             ' key (default cumulative)')
+    return parser
 
+#**********************************************************************
+#  Return the State class of the environment chosen by args,
+#  with its heuristic and goal set up.
+#
+def load_env( args ):
     if args.env == 'sliding':
         from sliding import State
     elif args.env == 'romania':
         from romania import State
     elif args.env == 'graph':
         from graph   import State
+    elif args.env == 'file':
+        from file_graph import State
+        State.load(args)
     else:
-        print('Unknown Environment:',args.env)
-        exit(1)
+        sys.exit('Unknown Environment: %s' % args.env)
 
-    start_state = State.start_state(args)
+    if not args.h is None:
+        if not hasattr(State,'set_heuristic'):
+            sys.exit('No choice of heuristic for environment: %s' % args.env)
+        State.set_heuristic(args.h,args)
+
+    if hasattr(State,'set_pruning'):
+        State.set_pruning(args.prune)
 
     if not args.goal is None:
         State.set_goal(args.goal)
-    
-    print('Start:',end='')
-    start_state.print_state()
-    print()
-    start = Node(start_state,None,None,0,0,args.s,args.w)
-    num_expand = 0
-    solved = False
+    return State
 
-    if args.s == 'dfs' and not args.id:  # non-iterative depth first search
-        num_expand = search(start,args,1000000,num_expand)
+#**********************************************************************
+#  Search from start with the strategy chosen by args. Return the goal
+#  node (or None if there is no solution), the number of nodes expanded
+#  and a dict of further counts to report (the number expanded in each
+#  direction for bidirectional strategies, forgotten and regenerated
+#  nodes for rbfs and smastar, solutions and bound for arastar, workers
+#  for hdastar, trials and move times for lrtastar and rtaastar),
+#  otherwise None. Raise LimitReached if a
+#  limit is hit. A start the environment knows to be unsolvable (by
+#  parity, for the sliding tile puzzle) is not searched at all.
+#
+def run_search( start, args ):
+    start_clock(args)
 
-    elif( args.id ):                     # iterative deepening search
-        for max_cost in range(2,1000000,2):
-            print('limit:',max_cost,end='.')
-            num_expand = search(start,args,max_cost,num_expand)
-            print(' Expanded:',num_expand)
+    if hasattr(start.state,'solvable') and not start.state.solvable():
+        if not args.quiet:
+            print('Start state has the wrong parity for the goal.',
+                  file=args.out)
+        return (None,0,None)
+
+    if args.closed and not args.id:      # graph search
+        closed = set()
+        best_g = {start.state.key():0}
     else:
-        heap = MyHeap(args.s)
-        heap.insert(start)
-        while heap.size > 0 and not solved:
-            num_expand += 1
-            node = heap.remove_min()
-            if args.v:
-                node.print_node_ghf(args,args.unique)
-            if num_expand % 1000 == 0:
-                print(num_expand)
-            if( node.state.is_goal()):
-                solved = True
-                print_solution(node,num_expand,args)
+        closed = None
+        best_g = None
+
+    if args.s in ['bibfs','biucs','biastar']:   # bidirectional search
+        from bidirectional import bidirectional_search
+        (node,expanded) = bidirectional_search(start,args)
+        return (node,expanded[0] + expanded[1],
+                {'Forward expanded':expanded[0],
+                 'Backward expanded':expanded[1]})
+
+    elif args.s in ['rbfs','smastar']:    # memory bounded best first search
+        from memory_bounded import memory_bounded_search
+        return memory_bounded_search(start,args)
+
+    elif args.s == 'arastar':            # anytime repairing A*
+        from anytime import anytime_search
+        return anytime_search(start,args)
+
+    elif args.s == 'hdastar':            # hash distributed (parallel) A*
+        from hda_star import parallel_search
+        return parallel_search(start,args)
+
+    elif args.s in ['lrtastar','rtaastar']:  # real-time search
+        from realtime import realtime_search
+        return realtime_search(start,args)
+
+    elif args.s == 'dfs' and not args.id:  # non-iterative depth first search
+        (num_expand,node) = search(start,args,1000000,0,closed,best_g)
+        return (node,num_expand,None)
+
+    elif args.s == 'lbfs':                # layered breadth first search
+        from layered_bfs import layered_search
+        (node,num_expand) = layered_search(start,args)
+        return (node,num_expand,None)
+
+    elif args.s == 'ebfs':                # layered, with layers on disk
+        from external_bfs import external_search
+        (node,num_expand) = external_search(start,args)
+        return (node,num_expand,None)
+
+    elif( args.id ):                     # iterative deepening search
+        (node,num_expand) = iterative_deepening(start,args)
+        return (node,num_expand,None)
+
+    heap = make_queue(start,args)
+    if not args.search_stats is None:
+        heap = args.search_stats.watch_queue(heap)
+    heap.insert(start)
+    num_expand = 0
+    while heap.size > 0:
+        node = heap.remove_min()
+        if not closed is None:
+            key = node.state.key()
+            if path_cost(node.depth,node.g,args) > best_g[key]:
+                continue
+            closed.add(key)
+        num_expand += 1
+        check_limits(num_expand,args)
+        if args.v:
+            node.print_node_ghf(args,args.unique)
+        if num_expand % 1000 == 0 and not args.quiet:
+            print(num_expand,file=args.out)
+        if( node.state.is_goal()):
+            return (node,num_expand,None)
+        (num_expand,goal) = generate_and_expand(node,args,0,num_expand,heap,
+                                                closed,best_g)
+        if not goal is None:
+            return (goal,num_expand,None)
+    return (None,num_expand,None)
+
+#**********************************************************************
+#  The priority queue chosen by --queue. auto takes the bucket queue if
+#  every cost will be an integer and not negative (the depth, for the
+#  breadth first strategies, or made of g and h if the environment
+#  declares both to be integers, with a weight from 0 to 2 for
+#  heuristic, whose cost (2-w)*g + w*h goes below 0 for w > 2),
+#  otherwise heapq. MyHeap (heap) always breaks ties in
+#  favour of the earlier node.
+#
+def make_queue( start, args ):
+    if args.queue == 'heap':
+        return MyHeap(args.s)
+    elif args.queue == 'bucket' or (args.queue == 'auto' and
+                                    integer_costs(start,args)):
+        return BucketQueue(args.s,args.w,args.tie)
+    elif args.queue in ['heapq','auto']:
+        return LazyHeap(args.s,args.w,args.tie)
+    sys.exit('Unknown queue: %s' % args.queue)
+
+def integer_costs( start, args ):
+    if args.s in ['bfs','bfs1','dfs']:
+        return True
+    if not getattr(start.state,'integer_costs',False):
+        return False
+    return args.s in ['ucs','astar','greedy'] or \
+           (args.s == 'heuristic' and args.w == int(args.w)
+            and 0 <= args.w <= 2)
+
+#**********************************************************************
+#  Iterative deepening on node cost (IDA* for astar). Each iteration
+#  searches depth first up to the current limit, and the next limit is
+#  the smallest cost that exceeded it. Return the goal node (or None
+#  if there is no solution) and the total number of nodes expanded.
+#
+def iterative_deepening( start, args ):
+    num_expand = 0
+    max_cost = start.cost
+    while True:
+        (node,expanded,next_cost) = depth_first_contour(start,args,max_cost,
+                                                        num_expand)
+        num_expand += expanded
+        if not args.quiet:
+            print('limit:',max_cost,end='.',file=args.out)
+            print(' Expanded:',expanded,end='.',file=args.out)
+            print(' Total:',num_expand,file=args.out)
+        if not node is None or next_cost == float('inf'):
+            return (node,num_expand)
+        max_cost = next_cost
+
+#**********************************************************************
+#  Depth first search from start, using an explicit stack, pruning
+#  nodes whose cost exceeds max_cost and states already on the current
+#  path. Return the goal node (or None), the number of nodes expanded,
+#  and the smallest cost of any pruned node. done is the number of
+#  nodes expanded by earlier iterations, counted towards --max_expand.
+#
+def depth_first_contour( start, args, max_cost, done=0 ):
+    num_expand = 0
+    next_cost = float('inf')
+    on_path = set()
+    stack = []
+    node = start
+    while True:
+        num_expand += 1
+        check_limits(done + num_expand,args)
+        if args.v:
+            node.print_node_ghf(args,args.unique)
+        if node.state.is_goal():
+            return (node,num_expand,next_cost)
+        on_path.add(node.state.key())
+        children = expand(node.state,args)
+        if args.shuffle:
+            random.shuffle(children)
+        within = []
+        for (state,act,cost) in children:
+            if state.key() in on_path:
+                if not args.search_stats is None:
+                    args.search_stats.pruned += 1
             else:
-                generate_and_expand(node,args,0,num_expand,heap)
+                child = Node(state,node,act,node.depth+1,node.g+cost,
+                             args.s,args.w)
+                if child.cost <= max_cost:
+                    within.append(child)
+                elif child.cost < next_cost:
+                    next_cost = child.cost
+        within.reverse()                 # expand in the order generated
+        stack.append((node,within))
+        while stack and not stack[-1][1]:
+            on_path.discard(stack.pop()[0].state.key())
+        if not stack:
+            return (None,num_expand,next_cost)
+        node = stack[-1][1].pop()
 
 #**********************************************************************
 #  Search recursively, until goal is reached or max_cost is exceeded.
-#  Return the total number of nodes expanded.
+#  Return the total number of nodes expanded, and the goal node
+#  (or None if it was not reached).
 #
-def search( node, args, max_cost, num_expand=0 ):
+def search( node, args, max_cost, num_expand=0, closed=None, best_g=None ):
     num_expand += 1
+    check_limits(num_expand,args)
+    if not closed is None:
+        closed.add(node.state.key())
     if args.v:
         node.print_node_ghf(args,args.unique)
     if( node.state.is_goal()):
-        solved = True
-        print_solution(node,num_expand,args)
-        exit(1)
+        return (num_expand,node)
     else:
-        return generate_and_expand(node,args,max_cost,num_expand,None)
+        return generate_and_expand(node,args,max_cost,num_expand,None,
+                                   closed,best_g)
 
 #**********************************************************************
 #  Generate all children of the specified node, check for goal,
-#  and either add to heap or search recursively.
+#  and either add to heap or search recursively. Return the number
+#  of nodes expanded, and the goal node if one was found.
+#  In graph search mode (closed and best_g given), a child is dropped
+#  if its state was already reached at no greater cost; otherwise
+#  best_g is lowered and the state is reopened if it had been expanded.
 #
-def generate_and_expand( node, args, max_cost=0, num_expand=0, heap=None ):
-    children = node.state.expand()
+def generate_and_expand( node, args, max_cost=0, num_expand=0, heap=None,
+                         closed=None, best_g=None ):
+    children = expand(node.state,args)
+    stats = args.search_stats
     if args.shuffle:
         random.shuffle(children)
     for (state,act,cost) in children:
         if (args.s == 'bfs' or args.s == 'dfs') and state.is_goal():
             child = Node(state,node,act,node.depth+1,node.g+cost,args.s,args.w)
-            print_solution(child,num_expand,args)
-            exit(1)
+            return (num_expand,child)
+        elif not best_g is None:
+            key = state.key()
+            g = path_cost(node.depth+1,node.g+cost,args)
+            if key in best_g and best_g[key] <= g:
+                if not stats is None:
+                    stats.duplicates += 1
+                continue
+            best_g[key] = g
+            if not stats is None and key in closed:
+                stats.reopened += 1
+            closed.discard(key)
+            child = Node(state,node,act,node.depth+1,node.g+cost,args.s,args.w)
+            if args.s == 'dfs':                # search recursively
+                (num_expand,goal) = search(child,args,max_cost,num_expand,
+                                           closed,best_g)
+                if not goal is None:
+                    return (num_expand,goal)
+            elif args.queue != 'heap':         # replace any queued entry
+                heap.insert(child,key)
+            else:
+                heap.insert(child)
         elif not ancestor_of(state,node):
             child = Node(state,node,act,node.depth+1,node.g+cost,args.s,args.w)
-            if args.id or args.s == 'dfs':     # search recursively
+            if args.s == 'dfs':                # search recursively
                 if child.cost <= max_cost:
-                    num_expand = search(child,args,max_cost,num_expand)
+                    (num_expand,goal) = search(child,args,max_cost,num_expand)
+                    if not goal is None:
+                        return (num_expand,goal)
             else:
                 heap.insert(child)
-    return num_expand
+        elif not stats is None:
+            stats.pruned += 1
+    return (num_expand,None)
+
+#**********************************************************************
+#  Return the children of state, timed by --stats if it is on.
+#
+def expand( state, args ):
+    if args.search_stats is None:
+        return state.expand()
+    else:
+        return args.search_stats.expand(state)
                 
+#**********************************************************************
+#  Return the path cost used to compare two nodes with the same state
+#  in graph search: depth for the breadth/depth first strategies
+#  (which ignore edge costs), g for all the others.
+#
+def path_cost( depth, g, args ):
+    if args.s == 'bfs' or args.s == 'bfs1' or args.s == 'dfs':
+        return depth
+    else:
+        return g
+
 #**********************************************************************
 #  Return True if state is an ancestor of node; False otherwise.
 #
@@ -143,7 +485,7 @@ def print_solution( node, num_expand, args ):
     if args.id:
         print(',id',end='')
     print(']',end=' ')
-    print('Generated:',Node.tick,end='.')
+    print('Generated:',node.counters.tick,end='.')
     print(' Expanded:',num_expand,end='.')
     print(' Length:',node.depth,end='.')
     print(' Cost:',node.g,end='.')
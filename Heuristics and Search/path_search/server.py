@@ -0,0 +1,284 @@
+#**********************************************************************
+#   server.py
+#
+#   Query server for the path search algorithms of search.py. The
+#   environment, heuristic tables and indexes are loaded once, by each
+#   of --workers processes, and queries arrive as JSON lines over TCP
+#   (--host, --port) or a Unix socket (--unix). A query gives options
+#   of search.py by name (those in QUERY_OPTIONS), over the defaults set
+#   on the command line, e.g. {"start":"867254301","s":"astar","h":"linear"},
+#   and an optional "id", which is returned with its answer. Options
+#   naming files or directories (--graph, --pdb_dir, --ebfs_dir, ...)
+#   are fixed when the server starts. The answer is the
+#   JSON line of --batch (status, path, cost, expanded, ...), plus
+#   "cached" and the latency in milliseconds. Queries on a connection
+#   are solved concurrently, and answered in order of completion.
+#
+#   Answers are kept in a least recently used cache of --cache entries,
+#   keyed on all the options of the query except the limits; only
+#   solved and unsolvable answers are cached. A query equal to one
+#   still being solved waits for that one. A query with no start and
+#   no seed (a random start, found by --d moves) is always solved
+#   afresh. {"op":"stats"} returns the
+#   counters: queries, throughput, cache hits and misses, queries in
+#   flight, errors and the latency percentiles of the last 10000.
+#
+#   python3 server.py --env sliding --h pdb --pdb 6-6-3 --closed --port 8765
+#   python3 server.py --env romania --h alt --closed --unix /tmp/search.sock
+#   printf '{"start":"16D75034BA8E29CF","id":1}\n{"op":"stats"}\n' | nc -q 60 localhost 8765
+#
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import signal
+import time
+
+from solver import Result, Session, DEFAULT_HEURISTIC, env_options, \
+                   error_message, make_args
+
+SERVER_OPTIONS = ['host','port','unix','cache','search_stats']
+
+#  options that only decide whether an answer is reached in time
+LIMITS = ['time_limit','max_expand']
+
+#  the options a query may set; the others are the server's
+QUERY_OPTIONS = ['start','goal','env','s','w','w_step','lookahead',
+                 'trials','h','pdb','landmarks','rows','cols','prune','d',
+                 'seed','closed','shuffle','max_nodes','queue','tie'] + LIMITS
+
+worker = {}
+
+#**********************************************************************
+#  Each worker process loads the environment of the server's defaults
+#  when it starts, and keeps one Session, replaced if a query needs
+#  other environment options.
+#
+def init_worker( options ):
+    solve_query(dict(options,start=None),False)
+
+def query_args( options ):
+    args = make_args(**options)
+    if args.h is None:
+        args.h = DEFAULT_HEURISTIC.get(args.env)
+    return args
+
+def solve_query( options, solve=True ):
+    try:
+        args = query_args(options)
+        session = worker.get('session')
+        if session is None or session.options != env_options(args):
+            worker['session'] = None
+            session = Session(args)
+            worker['session'] = session
+    except (Exception,SystemExit) as error:
+        result = Result(options.get('start'),options.get('goal'))
+        result.status = 'error'
+        result.message = error_message(error)
+        return result.as_dict()
+    if solve:
+        return session.solve(args,args.start,args.goal).as_dict()
+
+
+class Server:
+
+    def __init__(self,args):
+        self.defaults = {key:value for (key,value) in vars(args).items()
+                         if not key in SERVER_OPTIONS}
+        self.defaults.update(quiet=True,v=False)
+        self.size = args.cache
+        self.cache = collections.OrderedDict()    # key -> answer
+        self.pending = {}                         # key -> future
+        self.workers = args.workers if args.workers > 0 else \
+                       (os.cpu_count() or 1)
+        self.pool = multiprocessing.Pool(self.workers,init_worker,
+                                         (self.defaults,))
+        self.t0 = time.perf_counter()
+        self.queries = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.latency = collections.deque(maxlen=10000)
+
+    #******************************************************************
+    #  Read queries from a connection, each answered by its own task,
+    #  until the client closes it and every answer is written.
+    #
+    async def handle(self,reader,writer):
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip() == b'':
+                    continue
+                task = asyncio.create_task(self.reply(line,writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def reply(self,line,writer):
+        t0 = time.perf_counter()
+        try:
+            query = json.loads(line)
+            if not isinstance(query,dict):
+                raise ValueError
+        except ValueError:
+            query = None
+        if query is None:
+            answer = {'status':'error','message':'A query is a JSON object.'}
+        elif 'op' in query:
+            if query['op'] == 'stats':
+                answer = self.stats()
+            else:
+                answer = {'status':'error',
+                          'message':'Unknown op: %s' % query['op']}
+        else:
+            ident = query.pop('id',None)
+            answer = await self.answer(query)
+            if not ident is None:
+                answer = dict(id=ident,**answer)
+            answer['latency'] = round(1000*(time.perf_counter() - t0),3)
+            self.queries += 1
+            self.errors += answer['status'] == 'error'
+            self.latency.append(time.perf_counter() - t0)
+        writer.write((json.dumps(answer) + '\n').encode())
+        await writer.drain()
+
+    #******************************************************************
+    #  The answer to a query, from the cache, from an equal query being
+    #  solved, or from a worker.
+    #
+    async def answer(self,query):
+        for key in query:
+            if not key in self.defaults:
+                return {'status':'error','message':'Unknown option: ' + key}
+            if not key in QUERY_OPTIONS:
+                return {'status':'error',
+                        'message':'Option fixed when the server starts: ' + key}
+        options = dict(self.defaults)
+        options.update(query)
+        if options['start'] is None and options['seed'] is None:
+            self.misses += 1
+            return await self.solve(self.submit(options))
+        key = json.dumps({k:v for (k,v) in options.items()
+                          if not k in LIMITS},sort_keys=True)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return dict(self.cache[key],cached=True)
+        self.misses += 1
+        future = self.pending.get(key)
+        if future is None:
+            future = self.submit(options)
+            self.pending[key] = future
+            future.add_done_callback(lambda f: self.pending.pop(key,None))
+        return await self.solve(future,key)
+
+    #  the answer of future, cached under key (if not None)
+    async def solve(self,future,key=None):
+        try:
+            answer = await asyncio.shield(future)
+        except Exception as error:
+            return {'status':'error','message':repr(error)}
+        if answer['status'] in ['solved','unsolvable'] and self.size > 0 \
+           and not key is None:
+            self.cache[key] = answer
+            while len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+        return dict(answer,cached=False)
+
+    #  a future for the answer of a worker to options
+    def submit(self,options):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(result,error=None):
+            if future.done():
+                return
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+        self.pool.apply_async(solve_query,(options,),
+            callback=lambda r: loop.call_soon_threadsafe(resolve,r),
+            error_callback=lambda e: loop.call_soon_threadsafe(resolve,None,e))
+        return future
+
+    def stats(self):
+        seconds = time.perf_counter() - self.t0
+        latency = sorted(self.latency)
+
+        def percentile(p):
+            if not latency:
+                return 0.0
+            return round(1000*latency[min(len(latency)-1,
+                                          int(p*len(latency)))],3)
+
+        return {'queries':self.queries,
+                'per_sec':round(self.queries/max(seconds,1e-9),1),
+                'cache_hits':self.hits,
+                'cache_misses':self.misses,
+                'cache_size':len(self.cache),
+                'in_flight':len(self.pending),
+                'errors':self.errors,
+                'workers':self.workers,
+                'uptime':round(seconds,3),
+                'latency_ms':{'mean':round(1000*sum(latency)
+                                           /max(len(latency),1),3),
+                              'p50':percentile(0.5),
+                              'p95':percentile(0.95),
+                              'p99':percentile(0.99),
+                              'max':percentile(1.0)}}
+
+async def serve( args ):
+    server = Server(args)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM,
+                                                  asyncio.current_task().cancel)
+    try:
+        if args.unix is None:
+            listener = await asyncio.start_server(server.handle,args.host,
+                                                  args.port)
+            where = '%s:%d' % (args.host,args.port)
+        else:
+            listener = await asyncio.start_unix_server(server.handle,
+                                                       path=args.unix)
+            where = args.unix
+        print('Serving on',where,'with',server.workers,'workers.',flush=True)
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.pool.terminate()
+        if not args.unix is None and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+def main():
+    from search import make_parser
+    parser = make_parser()
+    parser.set_defaults(s='astar')
+    parser.add_argument('--host',type=str,default='127.0.0.1',
+                        help='address to listen on')
+    parser.add_argument('--port',type=int,default=8765,
+                        help='TCP port to listen on')
+    parser.add_argument('--unix',type=str,default=None,
+                        help='Unix socket to listen on, instead of TCP')
+    parser.add_argument('--cache',type=int,default=10000,
+                        help='answers kept in the cache (0 for none)')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except (KeyboardInterrupt,asyncio.CancelledError):
+        pass
+
+
+if __name__ == '__main__':
+    main()
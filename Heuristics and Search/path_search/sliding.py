@@ -5,132 +5,584 @@
 #   COMP3411/9814
 #   This code presents the sliding tile puzzle in a format used by the
 #   path search algorithms implemented in search.py
+#
+#   The board is packed into a single int, with the tile at position k
+#   stored in bits [k*b,(k+1)*b) where b = 4 (up to 16 tiles) or 5.
+#   The blank position is cached, and the heuristic of each child is
+#   derived from that of its parent by looking up the tile that moved.
+#   Moves are pruned by a finite state machine (--prune), and a start
+#   of the wrong parity is found unsolvable before any search.
 
-import numpy as np
 import random
+import sys
+
+#**********************************************************************
+#   Lookup tables shared by all states with the same number of rows
+#   and columns.
+#
+class Geometry:
+
+    def __init__(self,rows,cols,goal=None):
+        self.rows = rows
+        self.cols = cols
+        n = rows*cols
+        self.n = n
+        if n <= 16:
+            self.bits = 4
+        else:
+            self.bits = 5
+        self.mask = (1 << self.bits) - 1
+        if goal is None or len(goal) != n:
+            goal = list(range(1,n)) + [0]
+        self.goal_p = self.pack(goal)
+        self.goal_pos = self.unpack_positions(self.goal_p)
+        # moves[k] lists (j,action) where j is the position of the tile
+        # that slides into the blank at k
+        self.moves = []
+        for k in range(n):
+            moves = []
+            if k < (rows-1)*cols:
+                moves.append((k+cols,'down'))
+            if (k % cols) < cols-1:
+                moves.append((k+1,'right'))
+            if k % cols > 0:
+                moves.append((k-1,'left'))
+            if k >= cols:
+                moves.append((k-cols,'up'))
+            self.moves.append(moves)
+        # md[t][k] is the Manhattan distance of tile t at position k
+        self.md = [[0]*n for t in range(n)]
+        for t in range(1,n):
+            g = self.goal_pos[t]
+            for k in range(n):
+                self.md[t][k] = abs(g%cols - k%cols) + abs(g//cols - k//cols)
+        self.hf = None
+
+    def pack(self,tiles):
+        p = 0
+        for k in range(len(tiles)):
+            p |= int(tiles[k]) << (k*self.bits)
+        return p
+
+    def unpack(self,p):
+        return [(p >> (k*self.bits)) & self.mask for k in range(self.n)]
+
+    def unpack_positions(self,p):
+        where = [0]*self.n
+        for k in range(self.n):
+            where[(p >> (k*self.bits)) & self.mask] = k
+        return where
+
+
+#**********************************************************************
+#   Manhattan distance heuristic. Every heuristic provides evaluate(),
+#   which computes h from scratch, and update(), which derives the h of
+#   a child from that of its parent when tile t slides from j to k.
+#
+class Manhattan:
+
+    def __init__(self,geo):
+        self.md = geo.md
+
+    def evaluate(self,state):
+        return state.man_dist()
+
+    def update(self,parent,child,t,j,k):
+        return parent.h - self.md[t][j] + self.md[t][k]
+
+#**********************************************************************
+#   Manhattan distance plus 2 for each tile that must leave its goal
+#   row (or column) to let the others in that line pass (linear
+#   conflict). Each row and column is mapped to a code listing the goal
+#   columns (or rows) of the tiles that belong to it, and a table gives
+#   the number of tiles to remove for each code. A move only changes
+#   the two rows (or columns) that the tile leaves and enters.
+#
+class LinearConflict:
+
+    def __init__(self,geo):
+        self.md = geo.md
+        self.geo = geo
+        r = geo.rows
+        c = geo.cols
+        # cells[l] are the cells of line l: rows first, then columns
+        self.cells = [[i*c + j for j in range(c)] for i in range(r)] \
+                   + [[i*c + j for i in range(r)] for j in range(c)]
+        # code[l][t] is 1 + goal place of tile t within line l, or 0
+        self.code = []
+        for l in range(r+c):
+            code = [0]*geo.n
+            for t in range(1,geo.n):
+                g = geo.goal_pos[t]
+                if l < r and g // c == l:
+                    code[t] = g % c + 1
+                elif l >= r and g % c == l - r:
+                    code[t] = g // c + 1
+            self.code.append(code)
+        self.table = {r:conflict_table(r)}
+        self.table[c] = conflict_table(c)
+
+    def line(self,p,l):
+        b = self.geo.bits
+        m = self.geo.mask
+        code = self.code[l]
+        cells = self.cells[l]
+        base = len(cells)+1
+        x = 0
+        for k in reversed(cells):
+            x = x*base + code[(p >> (k*b)) & m]
+        return self.table[len(cells)][x]
+
+    def evaluate(self,state):
+        lc = 0
+        for l in range(len(self.cells)):
+            lc += self.line(state.p,l)
+        return state.man_dist() + 2*lc
+
+    def update(self,parent,child,t,j,k):
+        c = self.geo.cols
+        if j % c == k % c:                       # vertical: rows j, k
+            l0 = j // c
+            l1 = k // c
+        else:                                    # horizontal: cols j, k
+            l0 = self.geo.rows + j % c
+            l1 = self.geo.rows + k % c
+        line = self.line
+        lc = line(child.p,l0) + line(child.p,l1) \
+           - line(parent.p,l0) - line(parent.p,l1)
+        return parent.h - self.md[t][j] + self.md[t][k] + 2*lc
+
+#**********************************************************************
+#   Return a table giving, for each code of a line of length n (digit i
+#   of the code in base n+1 is 1 + the goal place of the tile in cell i,
+#   or 0 if it does not belong to the line), the number of tiles that
+#   must be removed to leave the others in increasing goal order.
+#
+def conflict_table( n ):
+    base = n+1
+    table = [0]*(base**n)
+    for x in range(base**n):
+        places = []
+        y = x
+        for i in range(n):
+            if y % base > 0:
+                places.append(y % base)
+            y //= base
+        if len(set(places)) < len(places):
+            continue                             # not a valid line
+        longest = [1]*len(places)                # increasing subsequence
+        for i in range(len(places)):
+            for j in range(i):
+                if places[j] < places[i] and longest[j] >= longest[i]:
+                    longest[i] = longest[j]+1
+        if places:
+            table[x] = len(places) - max(longest)
+    return table
+
+#**********************************************************************
+#   Walking distance. Vertically, a board is abstracted to a table
+#   giving, for each row, how many of its tiles have each goal row,
+#   together with the row of the blank. A move swaps the blank with a
+#   tile in the row above or below, and the number of such moves needed
+#   to reach the goal table is precomputed by breadth first search.
+#   Horizontally, the same is done for columns. The sum is admissible,
+#   since each real move moves one tile one row or one column.
+#   The indices of the two tables are kept in State.aux, and a move
+#   only follows one transition of one table.
+#
+class WalkingDistance:
+
+    def __init__(self,geo):
+        self.geo = geo
+        r = geo.rows
+        c = geo.cols
+        self.vline = [(geo.goal_pos[t] // c if t > 0 else -1)
+                      for t in range(geo.n)]
+        self.hline = [(geo.goal_pos[t] % c if t > 0 else -1)
+                      for t in range(geo.n)]
+        blank = geo.goal_pos[0]
+        self.vert = walking_table(r,self.vline,blank // c)
+        self.horz = walking_table(c,self.hline,blank % c)
+
+    def evaluate(self,state):
+        a = state.a
+        state.aux = (self.vert.index(a,self.geo.cols,True),
+                     self.horz.index(a,self.geo.cols,False))
+        return self.vert.dist[state.aux[0]] + self.horz.dist[state.aux[1]]
+
+    def update(self,parent,child,t,j,k):
+        (v,h) = parent.aux
+        c = self.geo.cols
+        if j % c == k % c:
+            v = self.vert.next[v][j > k][self.vline[t]]
+        else:
+            h = self.horz.next[h][j > k][self.hline[t]]
+        child.aux = (v,h)
+        return self.vert.dist[v] + self.horz.dist[h]
+
+
+class WalkingTable:
+
+    def __init__(self,lines,goal_line):
+        self.lines = lines
+        self.goal_line = goal_line
+        self.ids = {}
+        self.dist = []
+        self.next = []
+
+    def index(self,a,cols,vertical):
+        count = [[0]*self.lines for l in range(self.lines)]
+        blank = 0
+        for k in range(len(a)):
+            l = k // cols if vertical else k % cols
+            if a[k] == 0:
+                blank = l
+            else:
+                g = self.goal_line[a[k]]
+                count[l][g] += 1
+        return self.ids[(tuple(tuple(row) for row in count),blank)]
+
+#**********************************************************************
+#   Build the walking distance table for the given number of lines,
+#   where goal[t] is the goal line of tile t and blank that of the
+#   blank. next[i][d][g] is the configuration reached from i when a tile
+#   with goal line g moves into the blank's line from the line after it
+#   (d = 1) or before it (d = 0), or -1 if there is no such tile.
+#
+def walking_table( lines, goal, blank ):
+    table = WalkingTable(lines,goal)
+    count = [[0]*lines for l in range(lines)]
+    for t in range(1,len(goal)):
+        count[goal[t]][goal[t]] += 1
+    start = (tuple(tuple(row) for row in count),blank)
+    table.ids[start] = 0
+    configs = [start]
+    table.dist.append(0)
+    i = 0
+    while i < len(configs):
+        (count,blank) = configs[i]
+        moves = [[-1]*lines,[-1]*lines]
+        for d in [0,1]:
+            l = blank+1 if d == 1 else blank-1
+            if l < 0 or l >= lines:
+                continue
+            for g in range(lines):
+                if count[l][g] > 0:
+                    rows = [list(row) for row in count]
+                    rows[l][g] -= 1
+                    rows[blank][g] += 1
+                    config = (tuple(tuple(row) for row in rows),l)
+                    if not config in table.ids:
+                        table.ids[config] = len(configs)
+                        configs.append(config)
+                        table.dist.append(table.dist[i]+1)
+                    moves[d][g] = table.ids[config]
+        table.next.append(moves)
+        i += 1
+    return table
+
+#**********************************************************************
+#   Move pruning. A move is rejected if it completes a forbidden
+#   sequence of blank moves, one with a shorter equivalent:
+#     inverse  a move undoing the last one
+#     cycles   also eight moves taking the blank twice round a 2x2
+#              block in the same direction, which four moves the other
+#              way round do as well
+#   An optimal path has none of these, so pruning them keeps every
+#   optimal solution (and an optimal path to every state expanded with
+#   its least g). The sequences are compiled into a finite state machine
+#   (an Aho-Corasick automaton): table[s][action] is the state after the
+#   action from state s, or -1 if it completes a forbidden sequence.
+#   Each State keeps the machine state of the path that generated it.
+#
+PRUNING = ['none','inverse','cycles']
+
+def forbidden_sequences( name ):
+    inverse = State.inverse
+    sequences = [(a,inverse[a]) for a in inverse]
+    if name == 'cycles':
+        for loop in [('right','down','left','up'),('down','right','up','left')]:
+            for r in range(4):
+                sequences.append((loop[r:] + loop[:r])*2)
+    return sequences
+
+def compile_pruning( sequences ):
+    actions = sorted(State.inverse)
+    goto = [{}]                 # trie of the sequences
+    bad = [False]
+    for seq in sequences:
+        s = 0
+        for a in seq:
+            if not a in goto[s]:
+                goto[s][a] = len(goto)
+                goto.append({})
+                bad.append(False)
+            s = goto[s][a]
+        bad[s] = True
+    # breadth first, so the fallback of each state is done before it
+    table = [None]*len(goto)
+    table[0] = {a:goto[0].get(a,0) for a in actions}
+    fail = [0]*len(goto)
+    queue = [0]
+    for s in queue:
+        for a in actions:
+            if a in goto[s]:
+                u = goto[s][a]
+                fail[u] = table[fail[s]][a] if s > 0 else 0
+                bad[u] = bad[u] or bad[fail[u]]
+                table[u] = {b:goto[u][b] if b in goto[u]
+                            else table[fail[u]][b] for b in actions}
+                queue.append(u)
+    for s in range(len(table)):
+        table[s] = {a:-1 if bad[u] else u for (a,u) in table[s].items()}
+    return table
+
 
 class State:
 
+    __slots__ = ('p','blank','h','geo','aux','fsm')
+
+    geometry = {}
+    goal = None
+    heuristic_name = 'manhattan'
+    heuristic_args = None
+    pruning = None              # the move pruning table, if any
+    integer_costs = True        # unit moves and integer heuristics
+
     def __init__(self,a,rows=3,cols=0):
-        self.a = a
-        self.rows = rows
         if cols == 0:
-            self.cols = self.rows
-        else:
-            self.cols = cols
+            cols = rows
+        self.geo = State.get_geometry(rows,cols)
+        self.p = self.geo.pack(a)
+        self.blank = list(a).index(0)
+        self.aux = None
+        self.fsm = 0
         self.h = self.heuristic()
 
+    #  pickle without the geometry, which the receiving process builds
+    #  (or already has) for itself (hda_star.py)
+    def __getstate__(self):
+        return (self.p,self.blank,self.h,getattr(self,'aux',None),self.fsm,
+                self.geo.rows,self.geo.cols)
+
+    def __setstate__(self,data):
+        (self.p,self.blank,self.h,self.aux,self.fsm,rows,cols) = data
+        self.geo = State.get_geometry(rows,cols)
+
+    def get_geometry(rows,cols):
+        geo = State.geometry.get((rows,cols))
+        if geo is None:
+            geo = Geometry(rows,cols,State.goal)
+            State.geometry[(rows,cols)] = geo
+            geo.hf = State.make_heuristic(geo)
+        return geo
+
+    def set_heuristic(name,args=None):
+        if not name in ['manhattan','linear','walking','pdb']:
+            sys.exit('Unknown Heuristic: %s' % name)
+        State.heuristic_name = name
+        State.heuristic_args = args
+        State.geometry = {}
+
+    def set_pruning(name):
+        if not name in PRUNING:
+            sys.exit('Unknown move pruning: %s' % name)
+        if name == 'none':
+            State.pruning = None
+        else:
+            State.pruning = compile_pruning(forbidden_sequences(name))
+
+    def make_heuristic(geo):
+        if State.heuristic_name == 'pdb':
+            from pattern_db import PatternDB
+            args = State.heuristic_args
+            return PatternDB.load(geo,args.pdb,args.pdb_dir)
+        elif State.heuristic_name == 'linear':
+            return LinearConflict(geo)
+        elif State.heuristic_name == 'walking':
+            return WalkingDistance(geo)
+        else:
+            return Manhattan(geo)
+
+    @property
+    def rows(self):
+        return self.geo.rows
+
+    @property
+    def cols(self):
+        return self.geo.cols
+
+    @property
+    def a(self):
+        return self.geo.unpack(self.p)
+
+    #  a random start is a walk of --d moves from the goal, with move
+    #  pruning off, so that the boards are those of the plain moves
     def start_state(args):
         if args.start is None:
             state = State.goal_state(args.rows,args.cols)
-            for k in range(args.d):
-                children = state.expand()
-                (state,act,cost) = random.choice(children)
+            pruning = State.pruning
+            State.pruning = None
+            try:
+                for k in range(args.d):
+                    children = state.expand()
+                    (state,act,cost) = random.choice(children)
+            finally:
+                State.pruning = pruning
             return state
         elif args.start == 'tutorial':
-            return State(np.array([1,2,3,8,5,0,4,7,6]),3)
+            return State([1,2,3,8,5,0,4,7,6],3)
         else:
-            list = []
-            for ch in args.start:
-                n = ord(ch)
-                if n >= 48 and n <= 57:    # '0' to '9'
-                    list.append(n - 48)
-                elif n >= 65 and n <= 90:  # 'A' to 'Z'
-                    list.append(n - 55)
-                elif n >= 97 and n <= 122: # 'a' to 'z'
-                    list.append(n - 87)
-            if len(list) == 6:
-                row = 2
-                col = 3
-            elif len(list) == 9:
-                row = 3
-                col = 3
-            elif len(list) == 12:
-                row = 3
-                col = 4
-            elif len(list) == 16:
-                row = 4
-                col = 4
-            else:
-                print('Scanned',len(list),'tiles.')
-                exit(1)
-            return(State(np.array(list),row,col))
+            (list,row,col) = State.scan(args.start)
+            return(State(list,row,col))
+
+    def scan(text):
+        list = []
+        for ch in text:
+            n = ord(ch)
+            if n >= 48 and n <= 57:    # '0' to '9'
+                list.append(n - 48)
+            elif n >= 65 and n <= 90:  # 'A' to 'Z'
+                list.append(n - 55)
+            elif n >= 97 and n <= 122: # 'a' to 'z'
+                list.append(n - 87)
+        if len(list) == 6:
+            row = 2
+            col = 3
+        elif len(list) == 9:
+            row = 3
+            col = 3
+        elif len(list) == 12:
+            row = 3
+            col = 4
+        elif len(list) == 16:
+            row = 4
+            col = 4
+        else:
+            sys.exit('Scanned %d tiles.' % len(list))
+        if sorted(list) != [k for k in range(len(list))]:
+            sys.exit('Not a permutation of the tiles: %s' % text)
+        return (list,row,col)
+
+    def set_goal(goal):
+        if goal is None:                   # back to the standard goal
+            State.goal = None
+        else:
+            State.goal = State.scan(goal)[0]
+        State.geometry = {}
 
     def goal_state(rows=3,cols=0):
         if cols == 0:
             cols = rows
-        a = np.arange(1,(rows*cols)+1)
-        a[(rows*cols)-1] = 0
-        return State(a,rows,cols)
+        geo = State.get_geometry(rows,cols)
+        return State(geo.unpack(geo.goal_p),rows,cols)
+
+    def target_state(self):
+        return State.goal_state(self.rows,self.cols)
 
     def is_equal_to(self,other):
-        return(np.array_equal(self.a, other.a))
-    
+        return(self.p == other.p)
+
+    def key(self):
+        return self.p
+
     def expand( self ):
         children = []
-        r = self.rows
-        c = self.cols
-        k = np.where(self.a == 0)[0][0]
-        if k < (r-1)*c:
-            a1 = self.a.copy()
-            a1[k] = self.a[k+c]
-            a1[k+c] = 0
-            s1 = State(a1,r,c)
-            children.append((s1,'down',1))
-        if (k % c) < c-1:
-            a1 = self.a.copy()
-            a1[k] = self.a[k+1]
-            a1[k+1] = 0
-            s1 = State(a1,r,c)
-            children.append((s1,'right',1))
-        if k % c > 0:
-            a1 = self.a.copy()
-            a1[k] = self.a[k-1]
-            a1[k-1] = 0
-            s1 = State(a1,r,c)
-            children.append((s1,'left',1))
-        if k >= c:
-            a1 = self.a.copy()
-            a1[k] = self.a[k-c]
-            a1[k-c] = 0
-            s1 = State(a1,r,c)
-            children.append((s1,'up',1))
+        geo = self.geo
+        p = self.p
+        k = self.blank
+        b = geo.bits
+        hf = geo.hf
+        cls = self.__class__
+        table = cls.pruning
+        fsm = 0
+        for (j,act) in geo.moves[k]:
+            if not table is None:
+                fsm = table[self.fsm][act]
+                if fsm < 0:
+                    continue
+            t = (p >> (j*b)) & geo.mask
+            s1 = cls.__new__(cls)
+            s1.p = p ^ (t << (j*b)) ^ (t << (k*b))
+            s1.blank = j
+            s1.geo = geo
+            s1.fsm = fsm
+            s1.h = hf.update(self,s1,t,j,k)
+            children.append((s1,act,1))
         return children
 
+    def reverse_expand( self ):
+        children = []
+        for (state,act,cost) in self.expand():
+            children.append((state,State.inverse[act],cost))
+        return children
+
+    inverse = {'down':'up','up':'down','left':'right','right':'left'}
+
     def is_goal( self ):
-        r = self.rows
-        c = self.cols
-        for k in range((r*c)-1):
-            if self.a[k] != k+1:
-                return False
-        return True
+        return self.p == self.geo.goal_p
+
+    #  whether the goal can be reached: each move swaps the blank with a
+    #  tile, so the parity of the permutation taking this board to the
+    #  goal (blank included) must be that of the blank's Manhattan
+    #  distance to its goal position. O(n), by counting cycles.
+    def solvable( self ):
+        geo = self.geo
+        a = self.a
+        where = [geo.goal_pos[t] for t in a]
+        seen = [False]*geo.n
+        cycles = 0
+        for k in range(geo.n):
+            if not seen[k]:
+                cycles += 1
+                while not seen[k]:
+                    seen[k] = True
+                    k = where[k]
+        g = geo.goal_pos[0]
+        k = self.blank
+        dist = abs(g % geo.cols - k % geo.cols) + abs(g//geo.cols - k//geo.cols)
+        return (geo.n - cycles) % 2 == dist % 2
 
     def heuristic( self ):
-        return self.man_dist()
-        
-    def man_dist( self ):
-        r = self.rows
+        return self.geo.hf.evaluate(self)
+
+    def h_to( self, other ):
+        where = self.geo.unpack_positions(other.p)
         c = self.cols
+        a = self.a
         dist = 0
-        for j in range(0,r*c):
-            k = self.a[j]-1
-            if k >= 0:
-                dist = dist + abs(k%c - j%c) + abs(k//c - j//c)
+        for j in range(self.geo.n):
+            if a[j] > 0:
+                g = where[a[j]]
+                dist += abs(g%c - j%c) + abs(g//c - j//c)
         return dist
 
-    def print_action(self,action):
-        print(' (',action,')')
+    def man_dist( self ):
+        md = self.geo.md
+        a = self.a
+        dist = 0
+        for j in range(self.geo.n):
+            dist = dist + md[a[j]][j]
+        return dist
+
+    def print_action(self,action,file=None):
+        print(' (',action,')',file=file)
 
-    def print_state(self):
+    def print_state(self,file=None):
+        print(str(self),end='',file=file)
+
+    def __str__(self):
         r = self.rows
         c = self.cols
+        a = self.a
+        text = ''
         for i in range(r):
             if i > 0:
-                print('-',end='')
+                text += '-'
             for j in range(c):
-                k = self.a[(i*c)+ j]
+                k = a[(i*c)+ j]
                 if k < 10:
-                    print(k,end='')
+                    text += str(k)
                 else:
-                    print(chr(k+55),end='')
-
+                    text += chr(k+55)
+        return text
@@ -0,0 +1,202 @@
+#**********************************************************************
+#   solver.py
+#
+#   Library interface to the path search algorithms of search.py, for
+#   programs that solve many queries in one process:
+#
+#   from solver import solve
+#   result = solve('sliding',start='867254301',strategy='astar',
+#                  heuristic='linear',closed=True)
+#   print(result.status,result.cost,result.path)
+#
+#   Any other option of search.py can be given by name (rows=4,
+#   pdb='6-6-3', graph='romania_map.csv', ...). The environment is
+#   loaded once and kept while its options stay the same, so later
+#   queries only change the goal. Each query runs on its own copy of
+#   the options, with its own counters (node_heap.Counters), returned
+#   in its Result, and its own stream (args.out) for what the search
+#   prints, which is dropped; sys.stdout is left alone. An error (such
+#   as an unknown state) comes back as status 'error' with the message
+#   that search.py would have exited with.
+#
+#   The environments keep their goal and heuristic in class attributes,
+#   so queries from several threads are run one at a time, under a lock.
+#   For parallel search, use --s hdastar or --batch (worker processes).
+#
+import argparse
+import io
+import random
+import threading
+import time
+
+from node_heap import Node, Counters
+from limits import LimitReached
+
+#  what each environment uses when no heuristic is given
+DEFAULT_HEURISTIC = {'sliding':'manhattan','romania':'table',
+                     'graph':'table','file':'straight'}
+
+#  the options that are fixed when an environment is loaded
+ENV_OPTIONS = ['env','h','pdb','pdb_dir','landmarks','alt_dir','graph',
+               'coords','directed','prune']
+
+UNSET = object()
+
+class Result:
+
+    def __init__(self,start,goal):
+        self.start = start
+        self.goal = goal
+        self.status = None     # solved, unsolvable, limit or error
+        self.path = []         # states from start to goal, as text
+        self.actions = []      # the action leading to each state after start
+        self.cost = None
+        self.length = None
+        self.expanded = None
+        self.generated = 0
+        self.time = 0.0
+        self.counts = None     # further counts of some strategies
+        self.message = None
+
+    #  the fields shown in a --batch JSON line
+    def as_dict(self):
+        result = {'start':self.start,'goal':self.goal,'status':self.status}
+        if self.status == 'solved':
+            result['path'] = self.path
+            result['cost'] = self.cost
+            result['length'] = self.length
+        if not self.expanded is None:
+            result['expanded'] = self.expanded
+        if not self.message is None:
+            result['message'] = self.message
+        if not self.counts is None:
+            result['counts'] = self.counts
+        result['generated'] = self.generated
+        result['time'] = self.time
+        return result
+
+    def __repr__(self):
+        return 'Result(%s)' % ', '.join('%s=%r' % item
+                                        for item in self.as_dict().items())
+
+#**********************************************************************
+#  An environment loaded with the options in args, which solves one
+#  query at a time.
+#
+class Session:
+
+    def __init__(self,args):
+        from search import load_env
+        self.options = env_options(args)
+        self.State = load_env(args)
+        self.goal = UNSET
+
+    #******************************************************************
+    #  Solve from start to goal (or args.goal, if goal is None) with
+    #  the strategy and limits in args, seeding random with args.seed
+    #  (if given) as search.py does. Return a Result.
+    #
+    def solve(self,args,start=None,goal=None):
+        from search import run_search
+        if goal is None:
+            goal = args.goal
+        args = argparse.Namespace(**vars(args))
+        args.start = start
+        args.out = io.StringIO()
+        args.counters = Counters()
+        result = Result(start,goal)
+        t0 = time.perf_counter()
+        try:
+            with lock:
+                if goal != self.goal:
+                    self.goal = UNSET
+                    self.State.set_goal(goal)
+                    self.goal = goal
+                if not args.seed is None:
+                    random.seed(args.seed)
+                node = Node(self.State.start_state(args),None,None,0,0,
+                            args.s,args.w,args.counters)
+                (node,num_expand,counts) = run_search(node,args)
+            if node is None:
+                result.status = 'unsolvable'
+            else:
+                result.status = 'solved'
+                result.path = solution_path(node)
+                result.actions = solution_actions(node)
+                result.cost = node.g
+                result.length = node.depth
+            result.expanded = num_expand
+            result.counts = counts
+        except LimitReached as limit:
+            result.status = 'limit'
+            result.message = str(limit)
+        except (Exception,SystemExit) as error:
+            result.status = 'error'
+            result.message = error_message(error)
+        result.generated = args.counters.tick
+        result.time = round(time.perf_counter() - t0,6)
+        return result
+
+def env_options( args ):
+    return tuple(getattr(args,key) for key in ENV_OPTIONS)
+
+#  the message given to sys.exit(), if that was the error
+def error_message( error ):
+    if isinstance(error,SystemExit):
+        return str(error.code)
+    return repr(error)
+
+def solution_path( node ):
+    path = []
+    while not node is None:
+        path.append(str(node.state))
+        node = node.parent
+    path.reverse()
+    return path
+
+def solution_actions( node ):
+    actions = []
+    while not node.parent is None:
+        actions.append(node.action)
+        node = node.parent
+    actions.reverse()
+    return actions
+
+session = None
+lock = threading.RLock()
+
+#**********************************************************************
+#  Solve one query and return its Result. options are any other
+#  options of search.py, by name.
+#
+def solve( env='sliding', start=None, goal=None, strategy='astar',
+           weight=1.0, heuristic=None, time_limit=None, max_expand=None,
+           **options ):
+    global session
+    args = make_args(env=env,s=strategy,w=weight,time_limit=time_limit,
+                     max_expand=max_expand,**options)
+    args.h = heuristic if not heuristic is None else \
+             DEFAULT_HEURISTIC.get(env)
+    with lock:
+        if session is None or session.options != env_options(args):
+            session = None
+            try:
+                session = Session(args)
+            except (Exception,SystemExit) as error:
+                result = Result(start,goal)
+                result.status = 'error'
+                result.message = error_message(error)
+                return result
+        return session.solve(args,start,goal)
+
+#  search.py's options, with its defaults for those not given
+def make_args( **options ):
+    from search import make_parser
+    args = make_parser().parse_args([])
+    for (key,value) in options.items():
+        if not hasattr(args,key):
+            raise TypeError('Unknown option: ' + key)
+        setattr(args,key,value)
+    args.search_stats = None
+    args.quiet = options.get('quiet',True)
+    return args
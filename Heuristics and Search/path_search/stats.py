@@ -0,0 +1,218 @@
+#**********************************************************************
+#   stats.py
+#
+#   Search statistics for search.py --stats: expansion and generation
+#   rates sampled over time, current and peak queue size, duplicate and
+#   pruned node counts, peak memory traced by tracemalloc, and the wall
+#   time spent expanding states, evaluating the heuristic and in queue
+#   operations. Reported as text or as a single JSON line.
+#
+#   The heuristic is only timed separately for environments whose
+#   states take it from a replaceable heuristic object (sliding); for
+#   the others, it is included in the expansion time.
+#
+#   expanded is the total that strategies pass to limits.check_limits as
+#   they expand nodes. The queue size is the number of entries in
+#   all the queues of the strategy: its queues are wrapped by
+#   watch_queue, and heaps kept as lists use the timed heappush and
+#   heappop (bibfs reports the nodes of its frontier layers, and rbfs,
+#   which keeps no queue, the children it holds).
+#
+import heapq
+import json
+import time
+import tracemalloc
+
+
+class SearchStats:
+
+    def __init__(self,counters,interval=1.0):
+        self.counters = counters    # of the search (node_heap.Counters)
+        self.interval = interval
+        self.t0 = time.perf_counter()
+        self.tick0 = counters.tick
+        self.expanded = 0
+        self.duplicates = 0
+        self.reopened = 0
+        self.pruned = 0
+        self.queue_size = 0
+        self.queue_peak = 0
+        self.time_expand = 0.0
+        self.time_heuristic = 0.0
+        self.time_queue = 0.0
+        self.samples = []
+        self.last = (self.t0,0,self.tick0)
+        tracemalloc.start()
+
+    def generated(self):
+        return self.counters.tick - self.tick0
+
+    #  the children of state, timed
+    def expand(self,state,reverse=False):
+        t = time.perf_counter()
+        if reverse:
+            children = state.reverse_expand()
+        else:
+            children = state.expand()
+        t1 = time.perf_counter()
+        self.time_expand += t1 - t
+        if t1 - self.last[0] >= self.interval:
+            self.sample(t1)
+        return children
+
+    def sample(self,t):
+        (t0,expanded,tick) = self.last
+        self.samples.append({
+            'time':round(t - self.t0,3),
+            'expanded':self.expanded,
+            'generated':self.generated(),
+            'expanded_per_sec':round((self.expanded - expanded)/(t - t0)),
+            'generated_per_sec':round((self.counters.tick - tick)/(t - t0)),
+            'queue':self.queue_size})
+        self.last = (t,self.expanded,self.counters.tick)
+
+    #  wrap the queue (and, for sliding, the heuristic) to time them
+    def watch_queue(self,queue):
+        return TimedQueue(queue,self)
+
+    #  heapq operations on a heap kept as a list, timed and counted in
+    #  the queue size
+    def heappush(self,heap,entry):
+        t = time.perf_counter()
+        heapq.heappush(heap,entry)
+        self.time_queue += time.perf_counter() - t
+        self.resize(1)
+
+    def heappop(self,heap):
+        t = time.perf_counter()
+        entry = heapq.heappop(heap)
+        self.time_queue += time.perf_counter() - t
+        self.resize(-1)
+        return entry
+
+    #  entries added to (or, if change < 0, removed from) the queues
+    def resize(self,change):
+        self.queue_size += change
+        if self.queue_size > self.queue_peak:
+            self.queue_peak = self.queue_size
+
+    def watch_heuristic(self,state):
+        geo = getattr(state,'geo',None)
+        if not geo is None and not isinstance(geo.hf,TimedHeuristic):
+            geo.hf = TimedHeuristic(geo.hf,self)
+
+    def report(self):
+        t = time.perf_counter()
+        (current,peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        total = t - self.t0
+        expand = self.time_expand - self.time_heuristic
+        return {
+            'time':round(total,6),
+            'expanded':self.expanded,
+            'generated':self.generated(),
+            'expanded_per_sec':round(self.expanded/total) if total > 0 else 0,
+            'generated_per_sec':round(self.generated()/total) if total > 0 else 0,
+            'queue_size':self.queue_size,
+            'queue_peak':self.queue_peak,
+            'duplicates':self.duplicates,
+            'reopened':self.reopened,
+            'pruned':self.pruned,
+            'peak_memory':peak,
+            'time_expand':round(expand,6),
+            'time_heuristic':round(self.time_heuristic,6),
+            'time_queue':round(self.time_queue,6),
+            'time_other':round(total - expand - self.time_heuristic
+                               - self.time_queue,6),
+            'samples':self.samples}
+
+    def print_report(self,form='text'):
+        r = self.report()
+        if form == 'json':
+            print(json.dumps(r))
+            return
+        print('Time: %.3fs' % r['time'],end='.')
+        print(' Expanded/s:',r['expanded_per_sec'],end='.')
+        print(' Generated/s:',r['generated_per_sec'],end='.')
+        print()
+        print('Queue size:',r['queue_size'],end='.')
+        print(' Peak:',r['queue_peak'],end='.')
+        print(' Duplicates:',r['duplicates'],end='.')
+        print(' Reopened:',r['reopened'],end='.')
+        print(' Pruned:',r['pruned'],end='.')
+        print()
+        print('Peak memory: %.1fMB' % (r['peak_memory']/1e6),end='.')
+        print(' Expand: %.3fs' % r['time_expand'],end='.')
+        print(' Heuristic: %.3fs' % r['time_heuristic'],end='.')
+        print(' Queue: %.3fs' % r['time_queue'],end='.')
+        print(' Other: %.3fs' % r['time_other'],end='.')
+        print()
+        for s in r['samples']:
+            print('  %8.1fs expanded %10d (%8d/s) generated %10d (%8d/s)'
+                  ' queue %d' % (s['time'],s['expanded'],s['expanded_per_sec'],
+                  s['generated'],s['generated_per_sec'],s['queue']))
+
+
+#  heappush and heappop for a heap kept as a list, timed if there are
+#  search stats
+def heap_ops( args ):
+    if args.search_stats is None:
+        return (heapq.heappush,heapq.heappop)
+    return (args.search_stats.heappush,args.search_stats.heappop)
+
+
+class TimedQueue:
+
+    def __init__(self,queue,stats):
+        self.queue = queue
+        self.stats = stats
+        self.held = queue.size
+        stats.resize(self.held)
+
+    @property
+    def size(self):
+        return self.queue.size
+
+    def insert(self,n,*key):
+        t = time.perf_counter()
+        self.queue.insert(n,*key)
+        self.stats.time_queue += time.perf_counter() - t
+        self.resized()
+
+    def remove_min(self):
+        t = time.perf_counter()
+        n = self.queue.remove_min()
+        self.stats.time_queue += time.perf_counter() - t
+        self.resized()
+        return n
+
+    def min_cost(self):
+        t = time.perf_counter()
+        cost = self.queue.min_cost()
+        self.stats.time_queue += time.perf_counter() - t
+        self.resized()
+        return cost
+
+    #  count the change in this queue's size in the total of the queues
+    def resized(self):
+        self.stats.resize(self.queue.size - self.held)
+        self.held = self.queue.size
+
+
+class TimedHeuristic:
+
+    def __init__(self,hf,stats):
+        self.hf = hf
+        self.stats = stats
+
+    def evaluate(self,state):
+        t = time.perf_counter()
+        h = self.hf.evaluate(state)
+        self.stats.time_heuristic += time.perf_counter() - t
+        return h
+
+    def update(self,parent,child,t,j,k):
+        t0 = time.perf_counter()
+        h = self.hf.update(parent,child,t,j,k)
+        self.stats.time_heuristic += time.perf_counter() - t0
+        return h